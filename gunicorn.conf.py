@@ -0,0 +1,31 @@
+"""
+Configurazione di gunicorn (letta dal Procfile).
+
+Due profili, scelti con GUNICORN_PROFILE:
+
+- ``sync`` (default): worker WSGI classici, un processo per richiesta in corso;
+- ``uvicorn``: worker ASGI (uvicorn) con le viste di lettura async
+  (ASYNC_READ_VIEWS) e la registrazione async: un worker serve molte
+  connessioni lente o in attesa del database con un solo processo.
+"""
+import multiprocessing
+import os
+
+profile = os.environ.get('GUNICORN_PROFILE', 'sync')
+
+if profile == 'uvicorn':
+    wsgi_app = 'polling_project.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Ereditata dai worker: gli URL di lettura puntano alle viste async
+    os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+else:
+    wsgi_app = 'polling_project.wsgi:application'
+    worker_class = 'sync'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Log su stdout/stderr (come --log-file -)
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', None)
+errorlog = '-'
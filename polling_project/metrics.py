@@ -0,0 +1,261 @@
+"""
+Metriche per richiesta raccolte da PerformanceMiddleware.
+
+Il registro è per processo (ogni worker espone i propri numeri) e viene
+esposto su /api/_metrics in formato testo Prometheus. Query SQL, tempi
+dei serializer e hit/miss della cache sono misurati con un execute wrapper
+su ogni connessione e avvolgendo ``BaseSerializer.data`` e ``get``/``aget``
+dei backend di cache: l'instrumentazione viene installata solo se il
+middleware è attivo e, fuori da una richiesta misurata, si riduce alla
+lettura di una ContextVar. La ContextVar passa anche ai thread di
+sync_to_async: le richieste async vengono misurate allo stesso modo.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERY_LOG_LIMIT': 50,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def get_setting(name):
+    return getattr(settings, 'PERFORMANCE_METRICS', {}).get(name, DEFAULTS[name])
+
+
+@dataclass
+class RequestStats:
+    """Contatori di una singola richiesta."""
+    queries: int = 0
+    db_time: float = 0.0
+    serializer_time: float = 0.0
+    render_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # (sql, durata) delle prime sql_limit query, per il log delle richieste lente
+    sql: list = field(default_factory=list)
+    sql_limit: int = 0
+    _depth: int = 0
+
+
+current = contextvars.ContextVar('request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [conteggi per bucket..., somma, totale]
+
+    def observe(self, labels, value):
+        row = self.series.get(labels)
+        if row is None:
+            row = self.series[labels] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            row[index] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, row in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {row[-1]}')
+            lines.append(f'{self.name}_sum{{{base}}} {row[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {row[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_labels(label_names, labels)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """Metriche aggregate per vista, protette da un lock (thread dei worker)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter('polling_requests_total', 'Richieste per vista, metodo e stato')
+        self.duration = Histogram('polling_request_duration_seconds', 'Durata delle richieste', DURATION_BUCKETS)
+        self.db_queries = Histogram('polling_request_db_queries', 'Query SQL per richiesta', QUERY_BUCKETS)
+        self.db_time = Histogram('polling_request_db_seconds', 'Tempo SQL per richiesta', DURATION_BUCKETS)
+        self.serializer_time = Histogram(
+            'polling_request_serializer_seconds', 'Tempo dei serializer per richiesta', DURATION_BUCKETS
+        )
+        self.render_time = Histogram('polling_request_render_seconds', 'Tempo di rendering per richiesta', DURATION_BUCKETS)
+        self.cache = Counter('polling_cache_requests_total', 'Letture dalla cache per vista ed esito')
+
+    def record(self, view, method, status, duration, stats):
+        with self._lock:
+            self.requests.inc((view, method, status))
+            self.duration.observe((view, method), duration)
+            self.db_queries.observe((view,), stats.queries)
+            self.db_time.observe((view,), stats.db_time)
+            self.serializer_time.observe((view,), stats.serializer_time)
+            self.render_time.observe((view,), stats.render_time)
+            if stats.cache_hits:
+                self.cache.inc((view, 'hit'), stats.cache_hits)
+            if stats.cache_misses:
+                self.cache.inc((view, 'miss'), stats.cache_misses)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                *self.requests.render(('view', 'method', 'status')),
+                *self.duration.render(('view', 'method')),
+                *self.db_queries.render(('view',)),
+                *self.db_time.render(('view',)),
+                *self.serializer_time.render(('view',)),
+                *self.render_time.render(('view',)),
+                *self.cache.render(('view', 'result')),
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _timed_data(prop):
+    getter = prop.fget
+
+    def fget(self):
+        stats = current.get()
+        # Solo la chiamata più esterna: i serializer annidati non contano due volte
+        if stats is None or stats._depth:
+            return getter(self)
+        stats._depth += 1
+        started = time.perf_counter()
+        try:
+            return getter(self)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats._depth -= 1
+
+    fget._instrumented = True
+    return property(fget, prop.fset, prop.fdel, prop.__doc__)
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, default, version)
+        stats = current.get()
+        if stats is not None:
+            if value is default:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return value
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _counted_aget(aget):
+    async def wrapper(self, key, default=None, version=None):
+        value = await aget(self, key, default, version)
+        stats = current.get()
+        if stats is not None:
+            if value is default:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return value
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _timed_execute(execute, sql, params, many, context):
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        if len(stats.sql) < stats.sql_limit:
+            stats.sql.append((sql, elapsed))
+
+
+def _add_execute_wrapper(connection, **kwargs):
+    # Il wrapper resta sulla connessione (una per thread) anche dopo le riconnessioni
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+_instrument_lock = threading.Lock()
+
+
+def instrument():
+    """Installa (una volta sola) la misura delle query, dei serializer e delle letture dalla cache."""
+    from rest_framework.serializers import BaseSerializer
+    from polls.serializers import ValuesSerializer
+
+    with _instrument_lock:
+        connection_created.connect(_add_execute_wrapper, dispatch_uid='metrics_execute_wrapper')
+        for connection in connections.all(initialized_only=True):
+            _add_execute_wrapper(connection)
+        for cls in (BaseSerializer, ValuesSerializer):
+            if not getattr(cls.data.fget, '_instrumented', False):
+                cls.data = _timed_data(cls.data)
+        for config in settings.CACHES.values():
+            backend = import_string(config['BACKEND'])
+            if not getattr(backend.get, '_instrumented', False):
+                backend.get = _counted_get(backend.get)
+            # L'aget di BaseCache chiama get (già misurata): solo le versioni native
+            if backend.aget is not BaseCache.aget and not getattr(backend.aget, '_instrumented', False):
+                backend.aget = _counted_aget(backend.aget)
+
+
+def metrics_view(request):
+    """Metriche in formato testo Prometheus (solo se attive e da ALLOWED_IPS o staff)."""
+    if not get_setting('ENABLED'):
+        raise Http404
+    user = getattr(request, 'user', None)
+    if request.META.get('REMOTE_ADDR') not in get_setting('ALLOWED_IPS') and not (user and user.is_staff):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,103 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+logger = logging.getLogger('polling_project.slow_requests')
+
+
+class PerformanceMiddleware:
+    """
+    Misura ogni richiesta: tempo totale, numero e tempo delle query SQL,
+    tempo dei serializer e del rendering, hit/miss della cache.
+    I numeri finiscono nell'header Server-Timing e, aggregati per vista,
+    su /api/_metrics. Le richieste oltre SLOW_REQUEST_MS vengono loggate
+    con le loro query. Se PERFORMANCE_METRICS['ENABLED'] è falso il
+    middleware si rimuove dalla catena (nessun costo).
+    Sincrono sotto WSGI, async sotto ASGI (nessun passaggio di thread).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        metrics.instrument()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.server_timing = metrics.get_setting('SERVER_TIMING')
+        self.slow_seconds = metrics.get_setting('SLOW_REQUEST_MS') / 1000
+        self.sql_limit = metrics.get_setting('SLOW_QUERY_LOG_LIMIT')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = metrics.RequestStats(sql_limit=self.sql_limit)
+        token = metrics.current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats(sql_limit=self.sql_limit)
+        token = metrics.current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    def _finish(self, request, response, stats, duration):
+        view = self._view_name(request)
+        metrics.registry.record(view, request.method, response.status_code, duration, stats)
+        if self.server_timing:
+            response['Server-Timing'] = self._server_timing(duration, stats)
+        if duration >= self.slow_seconds:
+            self._log_slow(request, view, duration, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # Risposte DRF: il rendering avviene dopo la vista, misurato a parte
+        stats = metrics.current.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.url_name or match.route
+
+    @staticmethod
+    def _server_timing(duration, stats):
+        return ', '.join([
+            f'total;dur={duration * 1000:.2f}',
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'serializer;dur={stats.serializer_time * 1000:.2f}',
+            f'render;dur={stats.render_time * 1000:.2f}',
+            f'cache;desc="hit={stats.cache_hits} miss={stats.cache_misses}"',
+        ])
+
+    @staticmethod
+    def _log_slow(request, view, duration, stats):
+        queries = '\n'.join(f'  [{elapsed * 1000:.2f} ms] {sql}' for sql, elapsed in stats.sql)
+        logger.warning(
+            'Richiesta lenta %s %s (%s): %.1f ms, %d query in %.1f ms\n%s',
+            request.method, request.path, view, duration * 1000, stats.queries, stats.db_time * 1000, queries,
+        )
@@ -2,13 +2,15 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from .database import database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-your-secret-key-change-in-production'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
@@ -33,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Per prima: misura anche il costo degli altri middleware (inattiva se disabilitata)
+    'polling_project.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -63,12 +67,129 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'polling_project.wsgi.application'
 
-# Database
+# Database (profilo da DATABASE_URL: SQLite in WAL o PostgreSQL con pool,
+# vedi polling_project/database.py e .env.example)
 DATABASES = {
+    'default': database_config(os.environ, BASE_DIR),
+}
+
+# Cache (LocMemCache di default; per un backend su file:
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CACHE_LOCATION=/var/tmp/polling_cache)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'polling-cache'),
+    },
+}
+
+# Cache degli utenti autenticati via JWT (users.authentication). Nella cache
+# condivisa l'invalidazione al salvataggio dell'utente vale per tutti i
+# worker; con una cache per processo (LocMemCache) gli altri worker possono
+# accettare un utente disattivato o un token revocato per al più
+# AUTH_USER_CACHE_TTL secondi
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TTL = 30
+
+# Durata (secondi) dei risultati dei sondaggi in cache
+POLL_RESULTS_CACHE_TTL = int(os.environ.get('POLL_RESULTS_CACHE_TTL', 300))
+
+# Validità (secondi) delle chiavi Idempotency-Key nella creazione dei sondaggi
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+
+# Viste di lettura async (lista, dettaglio, risultati) per il deploy ASGI:
+# attivate dal profilo uvicorn di gunicorn.conf.py
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Intervallo (secondi) dei keep-alive sullo stream SSE dei risultati
+POLL_STREAM_KEEPALIVE = 15
+
+# max-age (secondi) delle risposte con ETag: 0 = rivalidare sempre con If-None-Match
+POLL_HTTP_MAX_AGE = int(os.environ.get('POLL_HTTP_MAX_AGE', 0))
+
+# Rollup dei voti nel tempo (polls.rollups, comando compact_vote_rollups)
+VOTE_ROLLUPS = {
+    'MINUTE_RETENTION_HOURS': 48,  # oltre, gli intervalli al minuto diventano orari
+    'MAX_BUCKETS': 1000,           # punti massimi di una timeline
+}
+
+# Dashboard degli utenti (users.dashboard): lunghezza delle liste nel
+# riepilogo precalcolato e durata del riepilogo in cache
+USER_DASHBOARD = {
+    'RECENT_POLLS': 20,
+    'RECENT_VOTES': 10,
+    'CACHE_TTL': 300,  # secondi
+}
+
+# Feed "trending" (polls.trending): emivita dei voti, dimensione del top-K
+# per worker e intervallo di salvataggio dei punteggi
+TRENDING = {
+    'HALF_LIFE_HOURS': 6,
+    'TOP_K': 100,
+    'FLUSH_INTERVAL': 5.0,  # secondi
+}
+
+# Screening dei voti in vote_poll (polls.screening): LRU delle coppie
+# (poll, user) e finestra scorrevole dei voti per IP e sondaggio.
+# Disattivo di default: dietro un proxy va attivato insieme a
+# TRUST_X_FORWARDED_FOR, altrimenti tutti i votanti hanno l'IP del proxy
+VOTE_SCREENING = {
+    'ENABLED': os.environ.get('VOTE_SCREENING', 'False') == 'True',
+    'SEEN_MAX_ENTRIES': 100000,     # coppie (poll, user) ricordate per processo
+    'TRACKED_MAX_ENTRIES': 50000,   # coppie (IP, poll) seguite per processo
+    'WINDOW_SECONDS': 60,
+    'FLAG_AFTER': 20,   # oltre questa soglia il voto è accettato ma segnalato
+    'BLOCK_AFTER': 60,  # oltre questa soglia il voto è rifiutato (429)
+}
+
+# Metriche per richiesta (polling_project.middleware.PerformanceMiddleware):
+# header Server-Timing, /api/_metrics (Prometheus) e log delle richieste lente
+PERFORMANCE_METRICS = {
+    'ENABLED': os.environ.get('PERFORMANCE_METRICS', 'False') == 'True',
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'SLOW_QUERY_LOG_LIMIT': 50,     # query riportate nel log di una richiesta lenta
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],  # client ammessi su /api/_metrics (oltre allo staff)
+}
+
+# Scadenza dei sondaggi (polls.expiry): disattivazione in blocco, risultati
+# definitivi e, opzionalmente, voti spostati in archived_votes
+POLL_EXPIRY = {
+    'AUTO_SWEEP': os.environ.get('POLL_EXPIRY_AUTO_SWEEP', 'False') == 'True',
+    'SWEEP_INTERVAL': 60.0,  # secondi
+    'BATCH_SIZE': 500,
+    'ARCHIVE_VOTES': os.environ.get('POLL_EXPIRY_ARCHIVE_VOTES', 'False') == 'True',
+}
+
+# Lista e dettaglio serializzati da righe .values() (polls.serializers, *FastSerializer)
+POLL_FAST_SERIALIZERS = os.environ.get('POLL_FAST_SERIALIZERS', 'False') == 'True'
+
+# Registrazione: thread per l'hash delle password e limite per IP
+# (token bucket: CAPACITY registrazioni, un gettone ogni REFILL_SECONDS)
+REGISTER_HASH_WORKERS = 2
+REGISTER_RATE_LIMIT = {
+    'CAPACITY': 5,
+    'REFILL_SECONDS': 60,
+}
+
+# True solo dietro un proxy fidato che imposta X-Forwarded-For
+TRUST_X_FORWARDED_FOR = os.environ.get('TRUST_X_FORWARDED_FOR', 'False') == 'True'
+# Proxy fidati davanti all'app: l'IP del client è l'elemento di
+# X-Forwarded-For in questa posizione contando da destra
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '1'))
+
+# Numero massimo di voti per richiesta su /api/polls/votes/bulk/
+BULK_VOTES_MAX_ITEMS = 5000
+
+# Coda write-behind dei voti: vote_poll accoda e risponde 202,
+# un thread in background (o manage.py flush_vote_journal) registra i voti
+VOTE_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('VOTE_WRITE_BEHIND', 'False') == 'True',
+    'JOURNAL_PATH': BASE_DIR / 'vote_journal.sqlite3',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,   # secondi
+    'MAX_PENDING': 10000,    # oltre questa soglia vote_poll risponde 503
+    'AUTO_FLUSH': True,      # False se la coda è svuotata solo dal comando
 }
 
 # Password validation
@@ -103,12 +224,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # FastJSONRenderer usa orjson se installato (stesso output di JSONRenderer)
+        'polls.renderers.FastJSONRenderer' if os.environ.get('FAST_JSON_RENDERER', 'False') == 'True'
+        else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
@@ -118,6 +245,8 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
+    # I token includono la versione della password: un cambio password li revoca
+    'CHECK_REVOKE_TOKEN': True,
 }
 
 # CORS settings (per il client)
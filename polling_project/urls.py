@@ -6,8 +6,11 @@ from rest_framework_simplejwt.views import (
 )
 from django.views.generic import TemplateView
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics', metrics_view, name='metrics'),
     path('api/', include('polls.urls')),
     path('api/users/', include('users.urls')),
     path('client/', TemplateView.as_view(template_name="index.html")),
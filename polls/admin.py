@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Poll, Choice, Vote
+from .models import Poll, Choice, Vote, ArchivedVote, FlaggedVote
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.contrib.admin import SimpleListFilter
@@ -16,15 +16,15 @@ class ExpiredFilter(SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == 'yes':
-            return queryset.filter(expiration_date__lt=timezone.now())
+            return queryset.filter(expires_at__lte=timezone.now())
         if self.value() == 'no':
-            return queryset.filter(expiration_date__gte=timezone.now())
+            return queryset.exclude(expires_at__lte=timezone.now())
         return queryset
 
 @admin.register(Poll)
 class PollAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'created_by', 'expires_at')
-    list_filter = ('expires_at', ExpiredFilter)
+    list_display = ('id', 'title', 'created_by', 'expires_at', 'is_active')
+    list_filter = ('expires_at', 'is_active', ExpiredFilter)
 
 
 
@@ -40,3 +40,19 @@ class VoteAdmin(admin.ModelAdmin):
     list_filter = ('poll', 'user')
 
 
+@admin.register(ArchivedVote)
+class ArchivedVoteAdmin(admin.ModelAdmin):
+    list_display = ('poll', 'choice', 'user', 'voted_at', 'archived_at')
+    list_filter = ('poll',)
+
+
+@admin.register(FlaggedVote)
+class FlaggedVoteAdmin(admin.ModelAdmin):
+    list_display = ('poll', 'user', 'ip_address', 'reason', 'action', 'window_count', 'reviewed', 'created_at')
+    list_filter = ('reviewed', 'reason', 'action', 'poll')
+    search_fields = ('ip_address', 'user__username')
+    actions = ['mark_reviewed']
+
+    @admin.action(description=_('Mark as reviewed'))
+    def mark_reviewed(self, request, queryset):
+        queryset.update(reviewed=True)
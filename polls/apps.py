@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import expiry, signals  # noqa: F401
+        # Lo sweeper parte solo nei processi che servono richieste
+        request_started.connect(expiry.start_sweeper, dispatch_uid='polls-expiry-sweeper')
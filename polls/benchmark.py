@@ -0,0 +1,469 @@
+"""
+Benchmark degli endpoint dell'API (usato da ``manage.py benchmark_api``).
+
+Il dataset sintetico viene creato in un database di test separato, come fa
+il test runner, quindi il database reale non viene mai toccato. Le richieste
+possono essere eseguite in-process con il test client di Django (con conteggio
+delle query) oppure contro un server gunicorn/uvicorn avviato localmente, con
+client asyncio concorrenti. Contro un server si misura anche la memoria
+(RSS del processo e dei worker, da /proc) e si possono aggiungere client
+lenti che tengono aperta una connessione: confronto tra worker sincroni
+(WSGI) e async (ASGI con le viste di lettura async).
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import counters, snapshots
+from .models import Poll, Choice, Vote
+from .renderers import FastJSONRenderer
+from .serializers import (
+    ChoiceSerializer, PollListSerializer, PollDetailSerializer,
+    ChoiceFastSerializer, PollListFastSerializer, PollDetailFastSerializer
+)
+
+PASSWORD = 'bench-password'
+
+SERVERS = {
+    'gunicorn': [sys.executable, '-m', 'gunicorn', 'polling_project.wsgi:application'],
+    'uvicorn': [sys.executable, '-m', 'uvicorn', 'polling_project.asgi:application', '--no-access-log'],
+    # Profilo uvicorn di gunicorn.conf.py (deploy ASGI)
+    'gunicorn-uvicorn': [
+        sys.executable, '-m', 'gunicorn', 'polling_project.asgi:application',
+        '--worker-class', 'uvicorn_worker.UvicornWorker',
+    ],
+}
+# Server ASGI: le letture passano dalle viste async
+ASGI_SERVERS = {'uvicorn', 'gunicorn-uvicorn'}
+
+
+@contextmanager
+def benchmark_database():
+    """Database di test temporaneo (su file per SQLite), distrutto all'uscita."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            # Database su file, condivisibile con un server avviato
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(tmp) / 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@dataclass
+class Dataset:
+    users: list
+    polls: list
+    choices: dict
+    tokens: dict = field(default_factory=dict)
+    # Coppie (utente, sondaggio) ancora senza voto, consumate dallo scenario "vote"
+    free_pairs: list = field(default_factory=list)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    body: dict = None
+    token: str = None
+
+
+def seed(users=200, polls=100, choices=4, votes_per_poll=50, batch_size=1000):
+    """Crea il dataset sintetico nel database corrente."""
+    User = get_user_model()
+    password = make_password(PASSWORD)  # un solo hash per tutti gli utenti
+    user_objs = User.objects.bulk_create(
+        [User(username=f'bench{i}', email=f'bench{i}@example.com', password=password) for i in range(users)],
+        batch_size=batch_size,
+    )
+    poll_objs = Poll.objects.bulk_create(
+        [Poll(title=f'Sondaggio {i}', description='Benchmark', created_by=random.choice(user_objs))
+         for i in range(polls)],
+        batch_size=batch_size,
+    )
+    choice_objs = Choice.objects.bulk_create(
+        [Choice(poll=poll, text=f'Opzione {j}') for poll in poll_objs for j in range(choices)],
+        batch_size=batch_size,
+    )
+    by_poll = {}
+    for choice in choice_objs:
+        by_poll.setdefault(choice.poll_id, []).append(choice.pk)
+
+    voters = user_objs[:votes_per_poll]
+    Vote.objects.bulk_create(
+        [Vote(user=user, poll=poll, choice_id=random.choice(by_poll[poll.pk]))
+         for poll in poll_objs for user in voters],
+        batch_size=batch_size,
+    )
+    counters.rebuild_counters()
+    snapshots.refresh([poll.pk for poll in poll_objs])
+
+    dataset = Dataset(users=user_objs, polls=[p.pk for p in poll_objs], choices=by_poll)
+    dataset.free_pairs = [(user, poll) for user in user_objs[votes_per_poll:] for poll in dataset.polls]
+    random.shuffle(dataset.free_pairs)
+    return dataset
+
+
+def _token(dataset, user):
+    if user.pk not in dataset.tokens:
+        dataset.tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+    return dataset.tokens[user.pk]
+
+
+def build_requests(scenario, dataset, count):
+    """Genera ``count`` richieste per uno scenario."""
+    if scenario == 'token':
+        return [
+            Request('POST', '/api/token/', {'username': random.choice(dataset.users).username, 'password': PASSWORD})
+            for _ in range(count)
+        ]
+    if scenario == 'list':
+        return [Request('GET', '/api/polls/') for _ in range(count)]
+    if scenario == 'detail':
+        return [Request('GET', f'/api/polls/{random.choice(dataset.polls)}/') for _ in range(count)]
+    if scenario == 'results':
+        return [Request('GET', f'/api/polls/{random.choice(dataset.polls)}/results/') for _ in range(count)]
+    if scenario == 'vote':
+        pairs, dataset.free_pairs = dataset.free_pairs[:count], dataset.free_pairs[count:]
+        return [
+            Request('POST', f'/api/polls/{poll}/vote/', {'choice': random.choice(dataset.choices[poll])},
+                    _token(dataset, user))
+            for user, poll in pairs
+        ]
+    raise ValueError(f"Scenario sconosciuto: {scenario}")
+
+
+SCENARIOS = ['token', 'list', 'detail', 'results', 'vote']
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        summary[f'p{pct}_ms'] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+
+def run_in_process(requests):
+    """Esegue le richieste in sequenza con il test client, contando le query."""
+    client = Client()
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for req in requests:
+        headers = {'Authorization': f'Bearer {req.token}'} if req.token else {}
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            response = client.generic(
+                req.method, req.path,
+                json.dumps(req.body) if req.body is not None else '',
+                content_type='application/json', headers=headers,
+            )
+            latencies.append(time.perf_counter() - t0)
+        queries.append(len(captured))
+        errors += response.status_code >= 400
+    return summarize(latencies, errors, time.perf_counter() - started, queries)
+
+
+def _encode(req):
+    """(intestazioni senza la riga vuota finale, corpo) di una richiesta HTTP/1.1."""
+    body = json.dumps(req.body).encode() if req.body is not None else b''
+    head = [
+        f'{req.method} {req.path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close',
+        'Content-Type: application/json', f'Content-Length: {len(body)}',
+    ]
+    if req.token:
+        head.append(f'Authorization: Bearer {req.token}')
+    return ('\r\n'.join(head) + '\r\n').encode(), body
+
+
+async def _http(port, req, delay=0):
+    """
+    Richiesta HTTP/1.1 minimale (una connessione per richiesta). Con ``delay``
+    il client è lento: la fine delle intestazioni arriva dopo ``delay`` secondi.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        head, body = _encode(req)
+        writer.write(head)
+        if delay:
+            await writer.drain()
+            await asyncio.sleep(delay)
+        writer.write(b'\r\n' + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    return int(status_line.split()[1])
+
+
+async def _slow_clients(port, count, delay):
+    """``count`` client lenti che ripetono una lettura della lista finché non vengono cancellati."""
+    async def client():
+        while True:
+            try:
+                await _http(port, Request('GET', '/api/polls/'), delay)
+            except (OSError, IndexError, ValueError):
+                await asyncio.sleep(0.1)
+
+    tasks = [asyncio.ensure_future(client()) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+async def _drive(port, requests, concurrency, slow_clients=0, slow_delay=5.0):
+    latencies, errors = [], 0
+    pending = iter(requests)
+    slow = await _slow_clients(port, slow_clients, slow_delay)
+
+    async def worker():
+        nonlocal errors
+        for req in pending:
+            t0 = time.perf_counter()
+            try:
+                status = await _http(port, req)
+            except OSError:
+                status = 599
+            latencies.append(time.perf_counter() - t0)
+            errors += status >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return latencies, errors, elapsed
+
+
+def tree_rss(pid):
+    """RSS in byte di un processo e dei suoi discendenti (Linux, /proc); None altrove."""
+    if not os.path.isdir(f'/proc/{pid}'):
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/status') as fp:
+                for line in fp:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as fp:
+                    stack.extend(int(child) for child in fp.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            # Processo terminato durante la lettura
+            continue
+    return total
+
+
+class MemorySampler:
+    """Campiona in un thread il picco di RSS del server durante il carico."""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = tree_rss(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _database_url():
+    db = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        return f"sqlite:///{os.path.abspath(db['NAME'])}"
+    return f"postgres://{db['USER']}:{db['PASSWORD']}@{db['HOST'] or 'localhost'}:{db['PORT'] or 5432}/{db['NAME']}"
+
+
+class Server:
+    """Server locale avviato su una porta libera, puntato al database di benchmark."""
+
+    def __init__(self, kind, workers=4, extra_args=()):
+        self.kind = kind
+        self.port = _free_port()
+        args = list(SERVERS[kind])
+        if kind.startswith('gunicorn'):
+            args += ['--workers', str(workers), '--bind', f'127.0.0.1:{self.port}', *extra_args]
+        else:
+            args += ['--workers', str(workers), '--port', str(self.port), *extra_args]
+        env = dict(
+            os.environ, DATABASE_URL=_database_url(), DEBUG='False',
+            ASYNC_READ_VIEWS=str(kind in ASGI_SERVERS),
+        )
+        self.process = subprocess.Popen(
+            args, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.kind} terminato all'avvio (installato?)")
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"{self.kind} non risponde sulla porta {self.port}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def __enter__(self):
+        self.wait_ready()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_against_server(server, requests, concurrency, slow_clients=0, slow_delay=5.0):
+    """Come summarize, più la memoria del server: a riposo, di picco e per connessione aperta."""
+    idle = tree_rss(server.process.pid)
+    with MemorySampler(server.process.pid) as memory:
+        latencies, errors, elapsed = asyncio.run(
+            _drive(server.port, requests, concurrency, slow_clients, slow_delay)
+        )
+    summary = summarize(latencies, errors, elapsed)
+    summary['rss_idle_mb'] = round(idle / 2 ** 20, 1) if idle is not None else None
+    summary['rss_peak_mb'] = round(memory.peak / 2 ** 20, 1) if memory.peak is not None else None
+    summary['rss_per_connection_kb'] = (
+        round((memory.peak - idle) / 1024 / (concurrency + slow_clients), 1)
+        if idle is not None and memory.peak is not None else None
+    )
+    return summary
+
+
+def compare(current, baseline):
+    """Variazioni percentuali rispetto a un risultato precedente."""
+    deltas = {}
+    for scenario, stats in current['results'].items():
+        base = baseline.get('results', {}).get(scenario)
+        if not base:
+            continue
+        deltas[scenario] = {
+            metric: round((stats[metric] - base[metric]) / base[metric] * 100, 1)
+            for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request', 'rss_peak_mb')
+            if stats.get(metric) is not None and base.get(metric)
+        }
+    return deltas
+
+
+def _timings(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return {
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 4),
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p95_ms': round(percentile(timings, 95) * 1000, 4),
+    }
+
+
+def serializer_cases(page_size=20):
+    """
+    Per ogni endpoint, le funzioni da misurare: ModelSerializer + JSONRenderer,
+    serializer veloce + JSONRenderer e serializer veloce + FastJSONRenderer.
+    I dati vengono letti una volta sola: si misura solo la serializzazione.
+    """
+    polls = Poll.objects.filter(is_active=True).select_related('created_by').order_by('-created_at', '-id')
+    page = list(polls[:page_size])
+    rows = list(PollListFastSerializer.values(polls)[:page_size])
+
+    poll_id = page[0].pk
+    detail_qs = Poll.objects.filter(pk=poll_id).select_related('created_by', 'results_snapshot')
+    detail, detail_row = detail_qs.get(), PollDetailFastSerializer.values(detail_qs).get()
+    choices = list(Choice.objects.filter(poll_id=poll_id))
+    choice_rows = list(ChoiceFastSerializer.values(Choice.objects.filter(poll_id=poll_id)))
+
+    stdlib, fast = JSONRenderer(), FastJSONRenderer()
+    return {
+        'list': {
+            'drf': lambda: stdlib.render(PollListSerializer(page, many=True).data),
+            'fast': lambda: stdlib.render(PollListFastSerializer(rows, many=True).data),
+            'fast+renderer': lambda: fast.render(PollListFastSerializer(rows, many=True).data),
+        },
+        'detail': {
+            'drf': lambda: stdlib.render(PollDetailSerializer(detail).data),
+            'fast': lambda: stdlib.render(PollDetailFastSerializer(detail_row).data),
+            'fast+renderer': lambda: fast.render(PollDetailFastSerializer(detail_row).data),
+        },
+        'choices': {
+            'drf': lambda: stdlib.render(ChoiceSerializer(choices, many=True).data),
+            'fast': lambda: stdlib.render(ChoiceFastSerializer(choice_rows, many=True).data),
+            'fast+renderer': lambda: fast.render(ChoiceFastSerializer(choice_rows, many=True).data),
+        },
+    }
+
+
+def run_serializers(page_size=20, iterations=500):
+    """Tempi di serializzazione per pagina, con lo speedup rispetto a DRF."""
+    results = {}
+    for name, variants in serializer_cases(page_size).items():
+        stats = {variant: _timings(func, iterations) for variant, func in variants.items()}
+        base = stats['drf']['mean_ms']
+        for variant in stats.values():
+            variant['speedup'] = round(base / variant['mean_ms'], 2) if variant['mean_ms'] else None
+        results[name] = stats
+    return results
@@ -0,0 +1,122 @@
+"""
+Import massivo di voti (chioschi e dispositivi di raccolta offline).
+
+Tutti i voti di una richiesta vengono validati contro un unico insieme
+precaricato di sondaggi, scelte e utenti, inseriti con bulk_create e
+contati con un UPDATE raggruppato per tabella.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import counters, rollups, screening, snapshots
+from .models import Poll, Choice, Vote
+from .signals import vote_committed
+from users import dashboard
+
+BATCH_SIZE = 500
+# Tentativi di insert in caso di voti concorrenti sulle stesse coppie (user, poll)
+CONFLICT_RETRIES = 3
+
+
+def ingest_votes(items):
+    """
+    Registra una lista di voti ``{'user', 'poll', 'choice'[, 'ip_address', 'voted_at']}``.
+
+    Restituisce un riepilogo con i voti creati, i duplicati (già presenti
+    o ripetuti nella richiesta) e gli errori per indice.
+    """
+    poll_ids = {item['poll'] for item in items}
+    now = timezone.now()
+    polls = {
+        poll.id: poll
+        for poll in Poll.objects.filter(pk__in=poll_ids, is_active=True).order_by().only('id', 'expires_at')
+    }
+    choice_polls = dict(
+        Choice.objects.filter(pk__in={item['choice'] for item in items}).values_list('id', 'poll_id')
+    )
+    users = set(
+        get_user_model().objects
+        .filter(pk__in={item['user'] for item in items}, is_active=True)
+        .values_list('id', flat=True)
+    )
+
+    errors = []
+    accepted = {}
+    duplicates = 0
+    for index, item in enumerate(items):
+        poll = polls.get(item['poll'])
+        if poll is None:
+            errors.append({'index': index, 'error': 'Poll not found'})
+        elif poll.expires_at and poll.expires_at < now:
+            errors.append({'index': index, 'error': 'This poll has expired'})
+        elif choice_polls.get(item['choice']) != poll.id:
+            errors.append({'index': index, 'error': 'Choice does not belong to this poll'})
+        elif item['user'] not in users:
+            errors.append({'index': index, 'error': 'User not found'})
+        elif (item['user'], item['poll']) in accepted:
+            duplicates += 1
+        else:
+            accepted[(item['user'], item['poll'])] = item
+
+    with transaction.atomic():
+        new_votes = _insert_new_votes(accepted, now)
+        duplicates += len(accepted) - len(new_votes)
+        # Contatori, rollup e dashboard solo per le righe inserite davvero
+        counters.record_votes(new_votes)
+        rollups.record(new_votes)
+        dashboard.record_votes(new_votes)
+        per_poll = Counter(vote.poll_id for vote in new_votes)
+        if per_poll:
+            snapshots.refresh(per_poll)
+        for poll_id, count in per_poll.items():
+            transaction.on_commit(
+                lambda poll_id=poll_id, count=count: vote_committed.send(sender=Vote, poll_id=poll_id, votes=count)
+            )
+        transaction.on_commit(lambda: _remember(new_votes))
+
+    return {'created': len(new_votes), 'duplicates': duplicates, 'errors': errors}
+
+
+def _remember(votes):
+    # Voti registrati: lo screening rifiuta i ripetuti senza database
+    for vote in votes:
+        screening.screen.remember(vote.poll_id, vote.user_id)
+
+
+def _insert_new_votes(accepted, now):
+    """
+    Inserisce i voti di ``accepted`` ({(user, poll): item}) non ancora presenti
+    e restituisce quelli inseriti. Va chiamata in una transazione.
+    ``voted_at`` è quello dell'item (coda write-behind) oppure ``now``.
+
+    Un voto concorrente inserito dopo il controllo fa fallire l'insert sul
+    vincolo unique (user, poll): si annulla il savepoint, si rilegge e si riprova.
+    """
+    for attempt in range(CONFLICT_RETRIES):
+        existing = set(
+            Vote.objects.filter(
+                user_id__in={user for user, _ in accepted},
+                poll_id__in={poll for _, poll in accepted},
+            ).values_list('user_id', 'poll_id')
+        )
+        new_votes = [
+            Vote(
+                user_id=item['user'],
+                poll_id=item['poll'],
+                choice_id=item['choice'],
+                ip_address=item.get('ip_address'),
+                voted_at=item.get('voted_at') or now,
+            )
+            for key, item in accepted.items()
+            if key not in existing
+        ]
+        try:
+            with transaction.atomic():
+                Vote.objects.bulk_create(new_votes, batch_size=BATCH_SIZE)
+            return new_votes
+        except IntegrityError:
+            if attempt == CONFLICT_RETRIES - 1:
+                raise
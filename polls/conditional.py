@@ -0,0 +1,97 @@
+"""
+GET condizionali (ETag / Last-Modified) per sondaggi e risultati.
+
+I validatori si calcolano senza caricare gli oggetti completi: da una
+sola riga (updated_at, total_votes come versione dei voti, updated_at
+dello snapshot, scadenza) per il dettaglio, dalla cache per i risultati e
+dalla pagina già letta per la lista. Se il client ha già la versione
+corrente la risposta è un 304 senza serializzazione.
+
+is_expired cambia col passare del tempo senza scritture: lo stato di
+scadenza entra nell'ETag e, per il dettaglio, expires_at in Last-Modified.
+La lista ha solo l'ETag: i voti aggiornano total_votes con F() senza
+toccare updated_at, quindi max(updated_at) non ne seguirebbe le modifiche.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Poll
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest())
+
+
+def _validators_row(poll_id):
+    return (
+        Poll.objects.filter(pk=poll_id, is_active=True)
+        .order_by()
+        .values_list('updated_at', 'total_votes', 'results_snapshot__updated_at', 'expires_at')
+    )
+
+
+def poll_validators(poll_id):
+    """(etag, last_modified) del dettaglio di un sondaggio, o (None, None)."""
+    return _poll_validators(poll_id, _validators_row(poll_id).first())
+
+
+async def apoll_validators(poll_id):
+    """Come poll_validators, con l'ORM async."""
+    return _poll_validators(poll_id, await _validators_row(poll_id).afirst())
+
+
+def _is_expired(expires_at, now):
+    return expires_at is not None and expires_at <= now
+
+
+def _poll_validators(poll_id, row):
+    if row is None:
+        return None, None
+    updated_at, total_votes, snapshot_updated_at, expires_at = row
+    expired = _is_expired(expires_at, timezone.now())
+    # Alla scadenza la risposta cambia (is_expired) anche senza scritture
+    last_modified = max(filter(None, (updated_at, snapshot_updated_at, expires_at if expired else None)))
+    etag = make_etag('poll', poll_id, updated_at.timestamp(), total_votes, last_modified.timestamp(), expired)
+    return etag, last_modified
+
+
+def page_validators(request, page):
+    """(etag, None) di una pagina della lista (istanze o righe .values()): niente Last-Modified"""
+    now = timezone.now()
+    versions = [
+        (item['id'], item['updated_at'], item['total_votes'], item['expires_at']) if isinstance(item, dict)
+        else (item.pk, item.updated_at, item.total_votes, item.expires_at)
+        for item in page
+    ]
+    etag = make_etag('polls', request.get_full_path(), *(
+        (pk, ts.timestamp(), votes, _is_expired(expires_at, now)) for pk, ts, votes, expires_at in versions
+    ))
+    return etag, None
+
+
+def not_modified(request, etag, last_modified=None):
+    """Risposta 304 se il client ha già questa versione, altrimenti None."""
+    if etag is None:
+        return None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified.timestamp() if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Il client può conservare la risposta ma deve sempre rivalidarla
+    patch_cache_control(response, max_age=getattr(settings, 'POLL_HTTP_MAX_AGE', 0), must_revalidate=True)
+    return response
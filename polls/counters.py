@@ -0,0 +1,89 @@
+"""
+Contatori denormalizzati dei voti.
+
+I contatori (Choice.votes_count, Poll.total_votes, CustomUser.votes_cast)
+vengono incrementati direttamente nel database con espressioni F(), senza
+leggere il valore in Python: niente aggiornamenti persi sotto carico e
+nessun salvataggio dell'intera riga.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedVote, Choice, Poll, Vote
+
+
+def record_vote(vote):
+    """
+    Applica i contatori per un voto appena inserito.
+    Va chiamata nella stessa transazione che crea il voto.
+    """
+    Choice.objects.filter(pk=vote.choice_id).update(votes_count=F('votes_count') + 1)
+    Poll.objects.filter(pk=vote.poll_id).update(total_votes=F('total_votes') + 1)
+    get_user_model().objects.filter(pk=vote.user_id).update(votes_cast=F('votes_cast') + 1)
+
+
+def _grouped_increment(queryset, field, counts):
+    """Un solo UPDATE che somma ``counts[pk]`` al campo di ogni riga."""
+    if not counts:
+        return
+    delta = Case(
+        *[When(pk=pk, then=Value(n)) for pk, n in counts.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    queryset.filter(pk__in=counts).update(**{field: F(field) + delta})
+
+
+def record_votes(votes):
+    """
+    Applica i contatori per un gruppo di voti appena inseriti,
+    con un UPDATE raggruppato per tabella.
+    """
+    _grouped_increment(Choice.objects, 'votes_count', Counter(v.choice_id for v in votes))
+    _grouped_increment(Poll.objects, 'total_votes', Counter(v.poll_id for v in votes))
+    _grouped_increment(get_user_model().objects, 'votes_cast', Counter(v.user_id for v in votes))
+
+
+def _count(model, field):
+    votes = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(votes), Value(0))
+
+
+def _count_votes(field):
+    """Subquery che conta i voti (anche archiviati) raggruppati per ``field``."""
+    return _count(Vote, field) + _count(ArchivedVote, field)
+
+
+def rebuild_counters(poll_ids=None):
+    """
+    Ricostruisce i contatori a partire dalle tabelle ``votes`` e ``archived_votes``.
+    Se ``poll_ids`` è indicato vengono ricalcolati solo quei sondaggi
+    (e gli utenti che vi hanno votato).
+    Restituisce il numero di righe aggiornate per scelte, sondaggi e utenti.
+    """
+    User = get_user_model()
+    choices = Choice.objects.all()
+    polls = Poll.objects.all()
+    users = User.objects.all()
+    if poll_ids is not None:
+        choices = choices.filter(poll_id__in=poll_ids)
+        polls = polls.filter(pk__in=poll_ids)
+        users = users.filter(
+            Q(pk__in=Vote.objects.filter(poll_id__in=poll_ids).values('user_id'))
+            | Q(pk__in=ArchivedVote.objects.filter(poll_id__in=poll_ids).values('user_id'))
+        )
+
+    return (
+        choices.update(votes_count=_count_votes('choice')),
+        polls.update(total_votes=_count_votes('poll')),
+        users.update(votes_cast=_count_votes('user')),
+    )
@@ -0,0 +1,144 @@
+"""
+Scadenza automatica dei sondaggi.
+
+Lo sweeper disattiva in blocco i sondaggi scaduti, congela i risultati
+nello snapshot (``is_final``) e, se ARCHIVE_VOTES è attivo, sposta i loro
+voti in ``archived_votes``: le tabelle calde contengono solo dati vivi.
+Viene eseguito dal comando ``sweep_expired_polls`` oppure da un thread
+periodico nel processo (AUTO_SWEEP, avviato alla prima richiesta).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import results_cache, snapshots
+from .models import ArchivedVote, FlaggedVote, Poll, PollResultSnapshot, PollTrendingScore, Vote
+from .pubsub import broker
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'AUTO_SWEEP': False,
+    'SWEEP_INTERVAL': 60.0,
+    'BATCH_SIZE': 500,
+    'ARCHIVE_VOTES': False,
+}
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'choice_id', 'poll_id', 'voted_at', 'ip_address')
+
+
+def get_setting(name):
+    return getattr(settings, 'POLL_EXPIRY', {}).get(name, DEFAULTS[name])
+
+
+def not_expired(now=None):
+    """Filtro dei sondaggi non ancora scaduti (anche se non ancora passati dallo sweeper)"""
+    return Q(expires_at__isnull=True) | Q(expires_at__gt=now or timezone.now())
+
+
+def archive_votes(poll_ids, batch_size=1000):
+    """Sposta i voti dei sondaggi indicati in archived_votes; restituisce quanti."""
+    poll_ids = list(poll_ids)
+    votes = Vote.objects.filter(poll_id__in=poll_ids).order_by().values_list(*ARCHIVE_FIELDS)
+    batch, moved = [], 0
+    for row in votes.iterator(chunk_size=batch_size):
+        batch.append(ArchivedVote(**dict(zip(ARCHIVE_FIELDS, row))))
+        if len(batch) >= batch_size:
+            ArchivedVote.objects.bulk_create(batch, ignore_conflicts=True)
+            moved += len(batch)
+            batch = []
+    if batch:
+        ArchivedVote.objects.bulk_create(batch, ignore_conflicts=True)
+        moved += len(batch)
+    # FlaggedVote.vote è SET_NULL: con delete() Django leggerebbe ogni voto e
+    # aggiornerebbe le segnalazioni per id. Segnalazioni staccate con un solo
+    # UPDATE (stesso sondaggio del voto), poi un solo DELETE in SQL: nessun
+    # altro modello punta ai voti e delete() non ha segnali da inviare
+    FlaggedVote.objects.filter(poll_id__in=poll_ids, vote__isnull=False).update(vote=None)
+    if poll_ids:
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(Vote._meta.db_table)} '
+                f'WHERE {quote(Vote._meta.get_field("poll").column)} IN ({", ".join(["%s"] * len(poll_ids))})',
+                poll_ids,
+            )
+    return moved
+
+
+def _publish_final(poll_ids):
+    for poll_id in poll_ids:
+        data = results_cache.refresh_results(poll_id)
+        if data is not None:
+            broker.publish(poll_id, data)
+
+
+def sweep(now=None, batch_size=None, archive=None):
+    """
+    Disattiva i sondaggi scaduti a blocchi di ``batch_size``.
+    Restituisce {'expired': sondaggi disattivati, 'archived': voti archiviati}.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    archive = get_setting('ARCHIVE_VOTES') if archive is None else archive
+    summary = {'expired': 0, 'archived': 0}
+
+    while True:
+        with transaction.atomic():
+            poll_ids = list(
+                Poll.objects.filter(is_active=True, expires_at__isnull=False, expires_at__lte=now)
+                .order_by().values_list('pk', flat=True)[:batch_size]
+            )
+            if not poll_ids:
+                break
+            # Risultati definitivi dai contatori, poi il sondaggio esce dai dati vivi.
+            # update() non aggiorna auto_now: updated_at esplicito (ETag)
+            snapshots.refresh(poll_ids)
+            PollResultSnapshot.objects.filter(poll_id__in=poll_ids).update(is_final=True)
+            summary['expired'] += Poll.objects.filter(pk__in=poll_ids).update(is_active=False, updated_at=now)
+            PollTrendingScore.objects.filter(poll_id__in=poll_ids).delete()
+            if archive:
+                summary['archived'] += archive_votes(poll_ids)
+            # Cache e client in streaming ricevono i risultati finali
+            transaction.on_commit(lambda ids=poll_ids: _publish_final(ids))
+    return summary
+
+
+class _SweepWorker:
+    """Thread daemon che esegue lo sweeper ogni SWEEP_INTERVAL secondi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='poll-expiry-sweeper', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(get_setting('SWEEP_INTERVAL'))
+            try:
+                sweep()
+            except Exception:
+                logger.exception('Errore durante la scadenza dei sondaggi')
+            finally:
+                close_old_connections()
+
+
+_worker = _SweepWorker()
+
+
+def start_sweeper(**kwargs):
+    """Receiver di request_started: avvia lo sweeper solo nei processi che servono richieste."""
+    if get_setting('AUTO_SWEEP'):
+        _worker.start()
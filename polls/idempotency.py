@@ -0,0 +1,100 @@
+"""
+Chiavi di idempotenza per le POST (header ``Idempotency-Key``).
+
+La prima richiesta con una chiave salva la sua risposta in IdempotencyKey
+nella stessa transazione dell'oggetto creato: o restano entrambi o
+nessuno dei due. Un nuovo tentativo dello stesso utente con la stessa
+chiave riceve la risposta salvata (dalla cache, altrimenti con una
+lettura per chiave) senza altre scritture. Due richieste concorrenti con
+la stessa chiave si scontrano sul vincolo unique (user, key): la seconda
+annulla la propria transazione e restituisce la risposta della prima.
+
+Le chiavi valgono IDEMPOTENCY_KEY_TTL secondi; ``purge`` elimina quelle
+scadute (comando ``sweep_expired_polls``).
+"""
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)
+
+
+def _cutoff():
+    return timezone.now() - datetime.timedelta(seconds=ttl())
+
+
+def cache_key(user_id, key):
+    return f'idempotency:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _to_json(data):
+    # Come la risposta salvata nel database (date già come stringhe)
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def fingerprint(data):
+    """sha256 del corpo della richiesta (form compresi, anche con valori ripetuti)."""
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def lookup(user, key):
+    """Risposta salvata per (utente, chiave) ancora valida, oppure None."""
+    entry = cache.get(cache_key(user.pk, key))
+    if entry is None:
+        entry = (
+            IdempotencyKey.objects.filter(user=user, key=key, created_at__gt=_cutoff())
+            .values('fingerprint', 'status_code', 'response').first()
+        )
+        if entry is not None:
+            cache.set(cache_key(user.pk, key), entry, ttl())
+    return entry
+
+
+def replay(entry, request_fingerprint):
+    """Risposta a un nuovo tentativo: la stessa della prima richiesta."""
+    if entry['fingerprint'] != request_fingerprint:
+        return Response(
+            {'error': f'{HEADER} already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(entry['response'], status=entry['status_code'], headers={'Idempotent-Replayed': 'true'})
+
+
+def save(user, key, request_fingerprint, response):
+    """
+    Salva la risposta per la chiave; va chiamata nella transazione che crea
+    l'oggetto. IntegrityError se un'altra richiesta ha già usato la chiave.
+    """
+    entry = {
+        'fingerprint': request_fingerprint,
+        'status_code': response.status_code,
+        'response': _to_json(response.data),
+    }
+    # Una chiave scaduta si può riusare
+    IdempotencyKey.objects.filter(user=user, key=key, created_at__lte=_cutoff()).delete()
+    IdempotencyKey.objects.create(user=user, key=key, **entry)
+    transaction.on_commit(lambda: cache.set(cache_key(user.pk, key), entry, ttl()))
+
+
+def purge():
+    """Elimina le chiavi scadute; restituisce quante."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lte=_cutoff()).delete()
+    return deleted
@@ -0,0 +1,135 @@
+import json
+import subprocess
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from polls import benchmark
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark degli endpoint (token, lista, dettaglio, risultati, voto) su un dataset sintetico "
+        "creato in un database di test separato. Salva throughput, latenze p50/p95/p99 e query per richiesta in JSON; "
+        "contro un server anche la memoria (RSS), per confrontare worker sincroni e async."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--polls', type=int, default=100)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--votes-per-poll', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=200, help="Richieste per scenario")
+        parser.add_argument(
+            '--scenario', action='append', choices=benchmark.SCENARIOS, dest='scenarios',
+            help="Scenario da eseguire (ripetibile). Default: tutti",
+        )
+        parser.add_argument(
+            '--server', choices=['none', *benchmark.SERVERS], default='none',
+            help="none = test client in-process; altrimenti avvia il server indicato",
+        )
+        parser.add_argument('--workers', type=int, default=4, help="Worker del server")
+        parser.add_argument('--concurrency', type=int, default=32, help="Client concorrenti (solo con --server)")
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help="Connessioni lente aggiuntive durante le misure (solo con --server)",
+        )
+        parser.add_argument(
+            '--slow-delay', type=float, default=5.0,
+            help="Secondi che un client lento impiega a completare la richiesta",
+        )
+        parser.add_argument('--output', help="File JSON dei risultati (default: bench_results/<data>-<commit>.json)")
+        parser.add_argument('--compare', help="JSON di un'esecuzione precedente da confrontare")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or benchmark.SCENARIOS
+        pairs = (options['users'] - options['votes_per_poll']) * options['polls']
+        if 'vote' in scenarios and pairs < options['requests']:
+            raise CommandError("Dataset troppo piccolo per lo scenario vote: aumentare --users o --polls")
+
+        with benchmark.benchmark_database():
+            results = self.run(scenarios, options)
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'database': connection.vendor,
+                'server': options['server'],
+                'workers': options['workers'] if options['server'] != 'none' else None,
+                'concurrency': options['concurrency'] if options['server'] != 'none' else 1,
+                'slow_clients': options['slow_clients'] if options['server'] != 'none' else 0,
+                'slow_delay': options['slow_delay'] if options['slow_clients'] else None,
+                'dataset': {key: options[key] for key in ('users', 'polls', 'choices', 'votes_per_poll')},
+                'requests_per_scenario': options['requests'],
+            },
+            'results': results,
+        }
+        if options['compare']:
+            with open(options['compare']) as fp:
+                report['compare'] = {'baseline': options['compare'], 'delta_pct': benchmark.compare(report, json.load(fp))}
+
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' /
+                      f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['commit']}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+        self.print_report(report)
+        self.stdout.write(self.style.SUCCESS(f"Risultati salvati in {output}"))
+
+    def run(self, scenarios, options):
+        self.stdout.write("Creazione del dataset...")
+        dataset = benchmark.seed(
+            users=options['users'], polls=options['polls'],
+            choices=options['choices'], votes_per_poll=options['votes_per_poll'],
+        )
+        results = {}
+        if options['server'] == 'none':
+            for scenario in scenarios:
+                results[scenario] = benchmark.run_in_process(
+                    benchmark.build_requests(scenario, dataset, options['requests'])
+                )
+            return results
+
+        with benchmark.Server(options['server'], workers=options['workers']) as server:
+            # Riscaldamento: import e connessioni dei worker fuori dalle misure
+            benchmark.run_against_server(
+                server, benchmark.build_requests('list', dataset, options['workers'] * 5), options['concurrency']
+            )
+            for scenario in scenarios:
+                results[scenario] = benchmark.run_against_server(
+                    server, benchmark.build_requests(scenario, dataset, options['requests']), options['concurrency'],
+                    slow_clients=options['slow_clients'], slow_delay=options['slow_delay'],
+                )
+        return results
+
+    def print_report(self, report):
+        delta = report.get('compare', {}).get('delta_pct', {})
+        self.stdout.write(
+            f"{'scenario':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'query':>8}{'errori':>8}"
+            f"{'RSS MB':>10}{'KB/conn':>10}"
+        )
+        for scenario, stats in report['results'].items():
+            self.stdout.write(
+                f"{scenario:<10}{stats['throughput_rps'] or '-':>10}{stats['p50_ms'] or '-':>10}"
+                f"{stats['p95_ms'] or '-':>10}{stats['p99_ms'] or '-':>10}"
+                f"{stats['queries_per_request'] if stats['queries_per_request'] is not None else '-':>8}"
+                f"{stats['errors']:>8}"
+                f"{stats.get('rss_peak_mb') or '-':>10}"
+                f"{stats['rss_per_connection_kb'] if stats.get('rss_per_connection_kb') is not None else '-':>10}"
+            )
+            if scenario in delta:
+                changes = ', '.join(f"{metric} {value:+}%" for metric, value in delta[scenario].items())
+                self.stdout.write(f"{'':<10}vs baseline: {changes}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from polls import benchmark
+from polls.renderers import orjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark della serializzazione per pagina: ModelSerializer + JSONRenderer "
+        "contro i serializer su righe .values() e FastJSONRenderer (orjson)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=100)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark.benchmark_database():
+            benchmark.seed(users=20, polls=options['polls'], choices=options['choices'], votes_per_poll=10)
+            results = benchmark.run_serializers(options['page_size'], options['iterations'])
+
+        self.stdout.write(f"orjson: {'sì' if orjson else 'non installato (fallback su json)'}")
+        self.stdout.write(f"{'endpoint':<10}{'variante':<16}{'media ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>9}")
+        for name, stats in results.items():
+            for variant, row in stats.items():
+                self.stdout.write(
+                    f"{name:<10}{variant:<16}{row['mean_ms']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                    f"{row['speedup'] or '-':>9}"
+                )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from polls import rollups
+
+
+class Command(BaseCommand):
+    help = "Compatta i rollup dei voti al minuto più vecchi di MINUTE_RETENTION_HOURS in rollup orari"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Ricostruisce prima i rollup da votes e archived_votes",
+        )
+        parser.add_argument(
+            '--poll', type=int, action='append', dest='polls',
+            help="Con --rebuild, solo questo sondaggio (ripetibile)",
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rollups.rebuild(options['polls'])
+            self.stdout.write("Rollup ricostruiti")
+        compacted = rollups.compact()
+        self.stdout.write(self.style.SUCCESS(f"Righe al minuto compattate: {compacted}"))
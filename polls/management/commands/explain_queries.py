@@ -0,0 +1,82 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from polls.expiry import not_expired
+from polls.models import Poll, Vote, VoteRollup, PollResultSnapshot, PollTrendingScore
+from polls.results_cache import FINAL_OR_ACTIVE
+from polls.pagination import PollCursorPagination, PollSearchPagination, VoteCursorPagination
+from polls.search import search_polls
+from polls.views import PollListCreateView, PollDetailView
+from users.dashboard import POLL_FIELDS, SUMMARY_FIELDS
+from users.models import CustomUser
+
+# Righe del piano che indicano una scansione completa della tabella
+FULL_SCAN = {
+    # Le tabelle virtuali FTS5 lette con MATCH (indice M) non sono scansioni complete
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b)(?!CONSTANT)(?!\w+ VIRTUAL TABLE INDEX \d+:M)(\w+)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+TEMP_SORT = re.compile(r'USE TEMP B-TREE|Sort\b')
+
+
+def endpoint_queries():
+    """Le query eseguite dagli endpoint, con parametri rappresentativi."""
+    now = timezone.now()
+    poll_id = Poll.objects.values_list('pk', flat=True).first() or 1
+    user_id = Vote.objects.values_list('user_id', flat=True).first() or 1
+    poll_list = PollListCreateView.queryset.filter(not_expired(now)).order_by(*PollCursorPagination.ordering)
+    vote_list = Vote.objects.filter(poll_id=poll_id).select_related('user').order_by(*VoteCursorPagination.ordering)
+
+    return [
+        ('poll-list-create', poll_list[:21]),
+        ('poll-list-create (cursore)', poll_list.filter(created_at__lt=now)[:21]),
+        ('poll-list-create (?q=)', search_polls(PollListCreateView.queryset.filter(not_expired(now)), 'sondaggio')
+            .order_by(*PollSearchPagination.ordering)[:21]),
+        # get() rimuove l'ordinamento di default
+        ('poll-detail', PollDetailView.queryset.filter(pk=poll_id).order_by()),
+        ('poll-results', PollResultSnapshot.objects.filter(FINAL_OR_ACTIVE, poll_id=poll_id).order_by()),
+        ('poll-vote (duplicati)', Vote.objects.filter(user_id=user_id, poll_id=poll_id)[:1]),
+        ('poll-votes', vote_list[:51]),
+        ('poll-votes (cursore)', vote_list.filter(voted_at__lt=now)[:51]),
+        ('conteggio voti per scelta', Vote.objects.filter(poll_id=poll_id).order_by().values('choice').annotate(n=Count('pk'))),
+        ('user-dashboard (riepilogo)', CustomUser.objects.filter(pk=1).values(*SUMMARY_FIELDS)[:1]),
+        ('user-dashboard (sondaggi)', Poll.objects.filter(pk__in=[1, 2, 3]).order_by().values(*POLL_FIELDS)),
+        ('poll-trending (top-K)', PollTrendingScore.objects.filter(poll__is_active=True).order_by('-log_score')[:100]),
+        ('poll-timeline', VoteRollup.objects.filter(poll_id=poll_id, bucket__gte=now, bucket__lt=now).order_by('bucket')),
+        ('sondaggi scaduti', Poll.objects.filter(is_active=True, expires_at__isnull=False, expires_at__lt=now).order_by()),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Esegue EXPLAIN sulle query degli endpoint e segnala le scansioni complete"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help="Stampa il piano completo di ogni query")
+        parser.add_argument('--fail-on-scan', action='store_true', help="Esce con errore se trova scansioni complete")
+
+    def handle(self, *args, **options):
+        full_scan = FULL_SCAN.get(connection.vendor)
+        if full_scan is None:
+            raise CommandError(f"Backend non supportato: {connection.vendor}")
+
+        problems = 0
+        for name, queryset in endpoint_queries():
+            plan = queryset.explain()
+            scans = full_scan.findall(plan)
+            sorts = TEMP_SORT.findall(plan)
+            if scans:
+                problems += 1
+                self.stdout.write(self.style.ERROR(f"[SCAN] {name}: scansione completa di {', '.join(scans)}"))
+            elif sorts:
+                self.stdout.write(self.style.WARNING(f"[SORT] {name}: ordinamento senza indice"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"[OK]   {name}"))
+            if options['verbose_plan'] or scans:
+                self.stdout.write(f"       {plan}".replace('\n', '\n       '))
+
+        if problems and options['fail_on_scan']:
+            raise CommandError(f"{problems} query con scansioni complete")
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import export
+from polls.models import Poll
+
+
+class Command(BaseCommand):
+    help = "Esporta in streaming i voti di un sondaggio in CSV o NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('poll_id', type=int)
+        parser.add_argument('--format', choices=list(export.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Comprime l'output in gzip")
+        parser.add_argument('--output', '-o', help="File di destinazione (default: stdout)")
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not Poll.objects.filter(pk=options['poll_id']).exists():
+            raise CommandError(f"Sondaggio {options['poll_id']} non trovato")
+
+        blocks = export.stream_votes(
+            options['poll_id'], options['format'], options['gzip'], options['chunk_size']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as fp:
+                for block in blocks:
+                    fp.write(block)
+        else:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from polls import writebehind
+
+
+class Command(BaseCommand):
+    help = "Svuota la coda write-behind dei voti nella tabella votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Voti per blocco (default: BATCH_SIZE)")
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Resta attivo e svuota la coda ogni FLUSH_INTERVAL secondi",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            created = writebehind.flush(options['batch_size'])
+            if created or not options['loop']:
+                self.stdout.write(f"Voti registrati: {created} (in coda: {writebehind.pending_count()})")
+            if not options['loop']:
+                break
+            time.sleep(writebehind.get_setting('FLUSH_INTERVAL'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from polls import snapshots
+from polls.models import Poll
+from polls.results_cache import invalidate_results
+
+
+class Command(BaseCommand):
+    help = "Ricostruisce gli snapshot dei risultati (PollResultSnapshot) dai contatori"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll', type=int, action='append', dest='polls',
+            help="ID del sondaggio da ricalcolare (ripetibile). Default: tutti",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        poll_ids = options['polls'] or list(Poll.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        written = 0
+        for start in range(0, len(poll_ids), batch_size):
+            batch = poll_ids[start:start + batch_size]
+            with transaction.atomic():
+                written += len(snapshots.refresh(batch))
+            for poll_id in batch:
+                invalidate_results(poll_id)
+        self.stdout.write(self.style.SUCCESS(f"Snapshot ricostruiti: {written}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from django.core.management import call_command
+
+from polls.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Ricostruisce i contatori dei voti (scelte, sondaggi, utenti) dalla tabella votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll', type=int, action='append', dest='polls',
+            help="ID del sondaggio da ricalcolare (ripetibile). Default: tutti",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            choices, polls, users = rebuild_counters(options['polls'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Contatori ricostruiti: {choices} scelte, {polls} sondaggi, {users} utenti"
+        ))
+        # Gli snapshot dei risultati derivano dai contatori
+        call_command('rebuild_result_snapshots', *[f'--poll={pk}' for pk in options['polls'] or []], stdout=self.stdout)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from polls import expiry, idempotency
+
+
+class Command(BaseCommand):
+    help = (
+        "Disattiva i sondaggi scaduti, congela i risultati e (opzionalmente) archivia i voti; "
+        "elimina le chiavi Idempotency-Key scadute"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Sondaggi per blocco (default: BATCH_SIZE)")
+        parser.add_argument(
+            '--archive', action='store_true', default=None,
+            help="Sposta i voti in archived_votes (default: ARCHIVE_VOTES)",
+        )
+        parser.add_argument('--no-archive', action='store_false', dest='archive')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Resta attivo ed esegue lo sweeper ogni SWEEP_INTERVAL secondi",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            summary = expiry.sweep(batch_size=options['batch_size'], archive=options['archive'])
+            keys = idempotency.purge()
+            if summary['expired'] or keys or not options['loop']:
+                self.stdout.write(
+                    f"Sondaggi scaduti: {summary['expired']} (voti archiviati: {summary['archived']}, "
+                    f"chiavi di idempotenza scadute: {keys})"
+                )
+            if not options['loop']:
+                break
+            time.sleep(expiry.get_setting('SWEEP_INTERVAL'))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_snapshots(apps, schema_editor):
+    Poll = apps.get_model('polls', 'Poll')
+    Choice = apps.get_model('polls', 'Choice')
+    PollResultSnapshot = apps.get_model('polls', 'PollResultSnapshot')
+
+    snapshots = []
+    for poll in Poll.objects.all().iterator():
+        total = poll.total_votes
+        results = [
+            {
+                'id': choice.id,
+                'choice': choice.text,
+                'votes': choice.votes_count,
+                'percentage': round((choice.votes_count / total) * 100, 1) if total > 0 else 0,
+            }
+            for choice in Choice.objects.filter(poll_id=poll.id).order_by('id')
+        ]
+        snapshots.append(PollResultSnapshot(poll_id=poll.id, title=poll.title, total_votes=total, results=results))
+    PollResultSnapshot.objects.bulk_create(snapshots, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollResultSnapshot',
+            fields=[
+                ('poll', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='results_snapshot', serialize=False, to='polls.poll')),
+                ('title', models.CharField(max_length=200)),
+                ('total_votes', models.IntegerField(default=0)),
+                ('results', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'poll_result_snapshots',
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
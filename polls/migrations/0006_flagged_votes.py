@@ -0,0 +1,35 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_expiry_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlaggedVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('reason', models.CharField(choices=[('ip_burst', 'Raffica di voti dallo stesso IP')], max_length=20)),
+                ('action', models.CharField(choices=[('accepted', 'Accettato'), ('rejected', 'Rifiutato')], max_length=10)),
+                ('window_count', models.IntegerField(default=0)),
+                ('reviewed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flagged_votes', to='polls.poll')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flagged_votes', to=settings.AUTH_USER_MODEL)),
+                ('vote', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flag', to='polls.vote')),
+            ],
+            options={
+                'db_table': 'flagged_votes',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
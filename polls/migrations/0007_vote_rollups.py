@@ -0,0 +1,54 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:48
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMinute
+
+
+def build_rollups(apps, schema_editor):
+    VoteRollup = apps.get_model('polls', 'VoteRollup')
+    utc = datetime.timezone.utc
+    for model in ('Vote', 'ArchivedVote'):
+        grouped = (
+            apps.get_model('polls', model).objects.order_by()
+            .annotate(minute=TruncMinute('voted_at', tzinfo=utc))
+            .values('poll_id', 'choice_id', 'minute')
+            .annotate(n=Count('pk'))
+        )
+        VoteRollup.objects.bulk_create(
+            (
+                VoteRollup(poll_id=row['poll_id'], choice_id=row['choice_id'], granularity='minute',
+                           bucket=row['minute'], votes=row['n'])
+                for row in grouped.iterator()
+            ),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_flagged_votes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minuto'), ('hour', 'Ora')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('votes', models.IntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_rollups', to='polls.choice')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_rollups', to='polls.poll')),
+            ],
+            options={
+                'db_table': 'vote_rollups',
+                'constraints': [models.UniqueConstraint(fields=('poll', 'bucket', 'granularity', 'choice'), name='vote_rollups_poll_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
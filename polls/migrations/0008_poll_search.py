@@ -0,0 +1,159 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:51
+
+import django.db.models.deletion
+import polls.search
+from django.db import migrations, models
+
+# Tabella e trigger dell'indice full-text, per backend (vedi polls.search)
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE polls_search USING fts5(
+        title, description, choices, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER polls_search_poll_insert AFTER INSERT ON polls BEGIN
+        INSERT INTO polls_search (rowid, title, description, choices)
+        VALUES (new.id, new.title, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER polls_search_poll_update AFTER UPDATE OF title, description ON polls BEGIN
+        UPDATE polls_search SET title = new.title, description = new.description WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER polls_search_poll_delete AFTER DELETE ON polls BEGIN
+        DELETE FROM polls_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER polls_search_choice_insert AFTER INSERT ON choices BEGIN
+        UPDATE polls_search SET choices = coalesce(
+            (SELECT group_concat(text, ' ') FROM choices WHERE poll_id = new.poll_id), ''
+        ) WHERE rowid = new.poll_id;
+    END
+    """,
+    """
+    CREATE TRIGGER polls_search_choice_update AFTER UPDATE OF text ON choices BEGIN
+        UPDATE polls_search SET choices = coalesce(
+            (SELECT group_concat(text, ' ') FROM choices WHERE poll_id = new.poll_id), ''
+        ) WHERE rowid = new.poll_id;
+    END
+    """,
+    """
+    CREATE TRIGGER polls_search_choice_delete AFTER DELETE ON choices BEGIN
+        UPDATE polls_search SET choices = coalesce(
+            (SELECT group_concat(text, ' ') FROM choices WHERE poll_id = old.poll_id), ''
+        ) WHERE rowid = old.poll_id;
+    END
+    """,
+    """
+    INSERT INTO polls_search (rowid, title, description, choices)
+    SELECT id, title, description,
+           coalesce((SELECT group_concat(text, ' ') FROM choices WHERE poll_id = polls.id), '')
+    FROM polls
+    """,
+]
+
+SQLITE_REVERSE_SQL = [
+    *(f'DROP TRIGGER IF EXISTS polls_search_{name}' for name in (
+        'poll_insert', 'poll_update', 'poll_delete', 'choice_insert', 'choice_update', 'choice_delete'
+    )),
+    'DROP TABLE IF EXISTS polls_search',
+]
+
+POSTGRES_SQL = [
+    """
+    CREATE TABLE polls_search (
+        rowid bigint PRIMARY KEY REFERENCES polls (id) ON DELETE CASCADE,
+        title text NOT NULL DEFAULT '',
+        description text NOT NULL DEFAULT '',
+        choices text NOT NULL DEFAULT '',
+        polls_search tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', title), 'A')
+            || setweight(to_tsvector('simple', description), 'B')
+            || setweight(to_tsvector('simple', choices), 'C')
+        ) STORED
+    )
+    """,
+    'CREATE INDEX polls_search_document_idx ON polls_search USING GIN (polls_search)',
+    """
+    CREATE FUNCTION polls_search_poll() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO polls_search (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description)
+        ON CONFLICT (rowid) DO UPDATE SET title = EXCLUDED.title, description = EXCLUDED.description;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER polls_search_poll AFTER INSERT OR UPDATE OF title, description ON polls
+    FOR EACH ROW EXECUTE FUNCTION polls_search_poll()
+    """,
+    """
+    CREATE FUNCTION polls_search_choices() RETURNS trigger AS $$
+    DECLARE
+        target bigint := CASE WHEN TG_OP = 'DELETE' THEN OLD.poll_id ELSE NEW.poll_id END;
+    BEGIN
+        UPDATE polls_search SET choices = coalesce(
+            (SELECT string_agg(text, ' ') FROM choices WHERE poll_id = target), ''
+        ) WHERE rowid = target;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER polls_search_choices AFTER INSERT OR UPDATE OF text OR DELETE ON choices
+    FOR EACH ROW EXECUTE FUNCTION polls_search_choices()
+    """,
+    """
+    INSERT INTO polls_search (rowid, title, description, choices)
+    SELECT id, title, description,
+           coalesce((SELECT string_agg(text, ' ') FROM choices WHERE poll_id = polls.id), '')
+    FROM polls
+    """,
+]
+
+POSTGRES_REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS polls_search_poll ON polls',
+    'DROP TRIGGER IF EXISTS polls_search_choices ON choices',
+    'DROP FUNCTION IF EXISTS polls_search_poll()',
+    'DROP FUNCTION IF EXISTS polls_search_choices()',
+    'DROP TABLE IF EXISTS polls_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_vote_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollSearchIndex',
+            fields=[
+                ('poll', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='polls.poll')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('choices', models.TextField()),
+                ('document', polls.search.SearchDocumentField(db_column='polls_search')),
+            ],
+            options={
+                'db_table': 'polls_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_SQL, 'postgresql': POSTGRES_SQL}),
+            _run({'sqlite': SQLITE_REVERSE_SQL, 'postgresql': POSTGRES_REVERSE_SQL}),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_poll_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollTrendingScore',
+            fields=[
+                ('poll', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='polls.poll')),
+                ('log_score', models.FloatField()),
+                ('votes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'poll_trending_scores',
+                'indexes': [models.Index(fields=['-log_score'], name='trending_log_score_idx')],
+            },
+        ),
+    ]
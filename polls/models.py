@@ -1,7 +1,10 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from .search import SearchDocumentField
+
 
 class Poll(models.Model):
     """
@@ -19,10 +22,26 @@ class Poll(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Contatore denormalizzato, aggiornato con F() da polls.counters
+    total_votes = models.IntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
         db_table = 'polls'
+        indexes = [
+            # Lista sondaggi attivi paginata a cursore su (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='polls_active_created_idx',
+            ),
+            # Sondaggi attivi con scadenza (scadenze e filtro "non scaduti")
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True, expires_at__isnull=False),
+                name='polls_active_expiry_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -33,9 +52,28 @@ class Poll(models.Model):
             return timezone.now() > self.expires_at
         return False
 
-    @property
-    def total_votes(self):
-        return self.votes.count()
+
+class PollSearchIndex(models.Model):
+    """
+    Indice full-text dei sondaggi (titolo, descrizione, testo delle scelte)
+    Tabella creata dalla migrazione 0008 e mantenuta da trigger (polls.search)
+    """
+    poll = models.OneToOneField(
+        Poll,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index'
+    )
+    title = models.TextField()
+    description = models.TextField()
+    choices = models.TextField()
+    document = SearchDocumentField(db_column='polls_search')
+
+    class Meta:
+        managed = False
+        db_table = 'polls_search'
 
 
 class Choice(models.Model):
@@ -49,6 +87,8 @@ class Choice(models.Model):
         related_name='choices'
     )
     text = models.CharField(max_length=200)
+    # Contatore denormalizzato, aggiornato con F() da polls.counters
+    votes_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -58,10 +98,6 @@ class Choice(models.Model):
     def __str__(self):
         return f"{self.poll.title} - {self.text}"
 
-    @property
-    def votes_count(self):
-        return self.votes.count()
-
 
 class Vote(models.Model):
     """
@@ -83,13 +119,224 @@ class Vote(models.Model):
         on_delete=models.CASCADE,
         related_name='votes'
     )
-    voted_at = models.DateTimeField(auto_now_add=True)
+    # default e non auto_now_add: i voti in coda (write-behind) tengono l'ora dell'accodamento
+    voted_at = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
         unique_together = ('user', 'poll')  # 1 voto per sondaggio
         ordering = ['-voted_at']
         db_table = 'votes'
+        indexes = [
+            # Voti di un sondaggio paginati a cursore su (voted_at, id)
+            models.Index(fields=['poll', '-voted_at', '-id'], name='votes_poll_voted_idx'),
+            # Aggregazioni dei voti per (poll, choice)
+            models.Index(fields=['poll', 'choice'], name='votes_poll_choice_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} voted for {self.choice.text}"
+
+
+class ArchivedVote(models.Model):
+    """
+    Voti dei sondaggi scaduti, spostati fuori da ``votes`` dallo sweeper
+    (polls.expiry) quando POLL_EXPIRY['ARCHIVE_VOTES'] è attivo
+    """
+    # Stesso id del voto originale: l'archiviazione è idempotente
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_votes'
+    )
+    choice = models.ForeignKey(
+        Choice,
+        on_delete=models.CASCADE,
+        related_name='archived_votes'
+    )
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name='archived_votes'
+    )
+    voted_at = models.DateTimeField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_votes'
+
+    def __str__(self):
+        return f"Voto archiviato {self.id} ({self.poll_id})"
+
+
+class FlaggedVote(models.Model):
+    """
+    Voti segnalati dallo screening di vote_poll (polls.screening), da
+    rivedere in admin: raffiche di voti dallo stesso IP sullo stesso sondaggio
+    """
+    REASON_IP_BURST = 'ip_burst'
+    REASON_CHOICES = [(REASON_IP_BURST, 'Raffica di voti dallo stesso IP')]
+    ACTION_ACCEPTED = 'accepted'
+    ACTION_REJECTED = 'rejected'
+    ACTION_CHOICES = [(ACTION_ACCEPTED, 'Accettato'), (ACTION_REJECTED, 'Rifiutato')]
+
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name='flagged_votes'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='flagged_votes'
+    )
+    # Il voto registrato (solo se accettato)
+    vote = models.OneToOneField(
+        Vote,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='flag'
+    )
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Voti dallo stesso IP sul sondaggio nella finestra di screening
+    window_count = models.IntegerField(default=0)
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'flagged_votes'
+
+    def __str__(self):
+        return f"{self.get_reason_display()} - {self.ip_address} ({self.poll_id})"
+
+
+class VoteRollup(models.Model):
+    """
+    Voti per (sondaggio, scelta, intervallo di tempo), per i grafici nel tempo
+    Aggiornato insieme ai voti da polls.rollups: gli intervalli al minuto
+    più vecchi vengono poi compattati in intervalli orari
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    GRANULARITY_CHOICES = [(MINUTE, 'Minuto'), (HOUR, 'Ora')]
+
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name='vote_rollups'
+    )
+    choice = models.ForeignKey(
+        Choice,
+        on_delete=models.CASCADE,
+        related_name='vote_rollups'
+    )
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    # Inizio dell'intervallo (UTC)
+    bucket = models.DateTimeField()
+    votes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'vote_rollups'
+        constraints = [
+            # Chiave degli upsert e indice della timeline (range su poll, bucket)
+            models.UniqueConstraint(
+                fields=['poll', 'bucket', 'granularity', 'choice'],
+                name='vote_rollups_poll_bucket_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.poll_id} {self.bucket:%Y-%m-%d %H:%M} ({self.granularity}): {self.votes}"
+
+
+class PollTrendingScore(models.Model):
+    """
+    Punteggio "trending" di un sondaggio: voti pesati con decadimento
+    esponenziale, salvati come logaritmo rispetto a un'epoca fissa
+    (polls.trending). L'ordine per log_score è l'ordine per velocità di
+    voto recente e non cambia col passare del tempo: le righe si
+    aggiornano solo quando arrivano voti
+    """
+    poll = models.OneToOneField(
+        Poll,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score'
+    )
+    log_score = models.FloatField()
+    votes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'poll_trending_scores'
+        indexes = [
+            models.Index(fields=['-log_score'], name='trending_log_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trending {self.poll_id}: {self.log_score:.3f}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Risposta di una POST inviata con header Idempotency-Key (polls.idempotency)
+    Salvata nella stessa transazione dell'oggetto creato: un nuovo tentativo
+    del client con la stessa chiave riceve la stessa risposta
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(max_length=255)
+    # sha256 del corpo della richiesta: la chiave non vale per richieste diverse
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
+
+
+class PollResultSnapshot(models.Model):
+    """
+    Risultati precalcolati di un sondaggio (conteggi e percentuali)
+    RELAZIONE: Poll -> PollResultSnapshot (OneToOne)
+    Aggiornato a ogni voto da polls.snapshots: leggere i risultati è
+    una sola lettura per chiave primaria
+    """
+    poll = models.OneToOneField(
+        Poll,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='results_snapshot'
+    )
+    title = models.CharField(max_length=200)
+    total_votes = models.IntegerField(default=0)
+    # [{"id", "choice", "votes", "percentage"}, ...] nell'ordine delle scelte
+    results = models.JSONField(default=list)
+    # Risultati definitivi: il sondaggio è scaduto ed è stato disattivato
+    is_final = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'poll_result_snapshots'
+
+    def __str__(self):
+        return f"Risultati di {self.title}"
@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class AsyncCursorPagination(CursorPagination):
+    """
+    CursorPagination con una variante async (``apaginate_queryset``) per le
+    viste che usano l'ORM async. È il paginate_queryset di DRF eseguito con
+    sync_to_async, come fa l'ORM async per ogni query: cursori identici tra
+    le viste sincrone e quelle async, senza dipendere dagli interni di DRF.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+    def get_paginated_data(self, data):
+        """Corpo della pagina (come get_paginated_response, senza Response DRF)"""
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+
+class PollCursorPagination(AsyncCursorPagination):
+    """
+    Paginazione a cursore su (created_at, id): nessun OFFSET né COUNT(*),
+    il costo di una pagina resta costante anche molto in profondità.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class VoteCursorPagination(CursorPagination):
+    """Paginazione a cursore dei voti di un sondaggio su (voted_at, id)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-voted_at', '-id')
+
+
+class PollSearchPagination(AsyncCursorPagination):
+    """Risultati della ricerca per pertinenza (rank), poi dal più recente"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('rank', '-created_at', '-id')
@@ -0,0 +1,60 @@
+"""
+Pub/sub in-process per gli aggiornamenti dei risultati.
+
+Ogni sottoscrittore (una connessione SSE) riceve una asyncio.Queue legata
+al proprio event loop. publish() può essere chiamata da qualsiasi thread
+(vote_poll gira in un thread anche sotto ASGI): il payload viene calcolato
+una sola volta e consegnato a tutte le code del sondaggio.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+# Aggiornamenti in coda per client lento prima di scartare i più vecchi
+MAX_PENDING = 16
+
+
+def _offer(queue, payload):
+    # Conta solo l'ultimo stato: se il client è indietro si scarta il più vecchio
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(payload)
+
+
+class ResultsBroker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(dict)
+
+    def subscribe(self, poll_id):
+        """Registra una nuova coda sull'event loop corrente e la restituisce."""
+        queue = asyncio.Queue(maxsize=MAX_PENDING)
+        with self._lock:
+            self._subscribers[poll_id][queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, poll_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(poll_id)
+            if subscribers is not None:
+                subscribers.pop(queue, None)
+                if not subscribers:
+                    del self._subscribers[poll_id]
+
+    def subscriber_count(self, poll_id):
+        with self._lock:
+            return len(self._subscribers.get(poll_id, ()))
+
+    def publish(self, poll_id, payload):
+        with self._lock:
+            targets = list(self._subscribers.get(poll_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, payload)
+            except RuntimeError:
+                # Event loop già chiuso: la connessione è terminata
+                self.unsubscribe(poll_id, queue)
+
+
+broker = ResultsBroker()
@@ -0,0 +1,68 @@
+"""
+Rate limiting a token bucket con lo stato nel framework di cache.
+
+Ogni chiave (es. l'IP del client) ha un secchio di CAPACITY gettoni che si
+ricarica di un gettone ogni REFILL_SECONDS. La lettura-scrittura in cache
+non è atomica: sotto richieste concorrenti dalla stessa chiave il limite
+è approssimato, il che basta per frenare le raffiche.
+"""
+import ipaddress
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_ip(request):
+    """
+    IP del client; X-Forwarded-For solo se il proxy è fidato.
+
+    Ogni proxy aggiunge in coda l'indirizzo da cui ha ricevuto la
+    richiesta, quindi con TRUSTED_PROXY_COUNT proxy fidati l'IP del client
+    è l'elemento in quella posizione da destra: quelli più a sinistra li
+    sceglie il client. Un valore mancante o non valido ricade su REMOTE_ADDR.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if not getattr(settings, 'TRUST_X_FORWARDED_FOR', False):
+        return remote_addr
+    forwarded = [entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 1)
+    if proxies < 1 or len(forwarded) < proxies:
+        return remote_addr
+    try:
+        return str(ipaddress.ip_address(forwarded[-proxies]))
+    except ValueError:
+        return remote_addr
+
+
+class TokenBucket:
+
+    def __init__(self, name, setting):
+        self.name = name
+        self.setting = setting
+
+    @property
+    def config(self):
+        return getattr(settings, self.setting)
+
+    def allow(self, key):
+        """
+        Consuma un gettone per ``key``.
+        Restituisce (consentito, secondi prima del prossimo gettone).
+        """
+        capacity = self.config['CAPACITY']
+        refill = self.config['REFILL_SECONDS']
+        cache_key = f'ratelimit:{self.name}:{key}'
+        now = time.time()
+
+        tokens, updated = cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) / refill)
+        if tokens < 1:
+            return False, (1 - tokens) * refill
+
+        # Scade quando il secchio sarebbe comunque di nuovo pieno
+        cache.set(cache_key, (tokens - 1, now), timeout=int(capacity * refill) + 1)
+        return True, 0
+
+
+register_rate_limit = TokenBucket('register', 'REGISTER_RATE_LIMIT')
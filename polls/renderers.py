@@ -0,0 +1,49 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer che usa orjson se installato, altrimenti il modulo json.
+    I tipi che orjson non gestisce (o formatta diversamente, come le date)
+    passano dall'encoder di DRF: l'output resta lo stesso di JSONRenderer.
+    """
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Output indentato (API navigabile, ?indent) solo con il renderer standard
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        # Come JSONRenderer: U+2028/U+2029 escapati (JSON valido anche come JavaScript)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class StreamExportRenderer(BaseRenderer):
+    """
+    Renderer per gli export in streaming: serve alla negoziazione del
+    formato (?format=csv|ndjson); i dati veri arrivano da una
+    StreamingHttpResponse. Qui si rendono solo le risposte di errore.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class CSVExportRenderer(StreamExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(StreamExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,143 @@
+"""
+Cache dei risultati dei sondaggi (framework di cache di Django).
+
+I risultati sono salvati per ID del sondaggio e riscritti (write-through)
+da vote_poll dopo il commit di ogni voto, così le letture di poll_results
+non toccano il database finché la chiave resta in cache. In caso di miss
+si legge solo lo snapshot precalcolato (PollResultSnapshot).
+"""
+import asyncio
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404
+
+from . import snapshots
+from .models import Poll, PollResultSnapshot
+
+RESULTS_KEY = 'polls:results:{}'
+LOCK_KEY = 'polls:results:{}:lock'
+
+# Durata massima del lock anti-stampede e attesa degli altri richiedenti
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+WAIT_ATTEMPTS = 20
+
+
+def _ttl():
+    return getattr(settings, 'POLL_RESULTS_CACHE_TTL', 60)
+
+
+FINAL_OR_ACTIVE = Q(poll__is_active=True) | Q(is_final=True)
+
+
+def build_results(snapshot):
+    """Payload dei risultati a partire dallo snapshot del sondaggio."""
+    return {
+        'poll': snapshot.title,
+        'total_votes': snapshot.total_votes,
+        'results': snapshot.results
+    }
+
+
+def _entry(snapshot):
+    """Voce in cache: payload più i validatori HTTP (ETag, Last-Modified)."""
+    data = build_results(snapshot)
+    digest = hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return {'data': data, 'etag': f'"{digest}"', 'last_modified': snapshot.updated_at}
+
+
+def _load(poll_id):
+    # Una lettura per chiave primaria: sondaggi attivi o scaduti con risultati definitivi
+    snapshot = PollResultSnapshot.objects.filter(FINAL_OR_ACTIVE, poll_id=poll_id).first()
+    if snapshot is None:
+        if not Poll.objects.filter(pk=poll_id, is_active=True).exists():
+            raise Http404
+        snapshot = snapshots.get_or_refresh(poll_id)
+    return _entry(snapshot)
+
+
+def refresh_results(poll_id):
+    """Ricalcola i risultati e li scrive in cache (da chiamare dopo il commit)."""
+    try:
+        entry = _load(poll_id)
+    except Http404:
+        invalidate_results(poll_id)
+        return None
+    cache.set(RESULTS_KEY.format(poll_id), entry, _ttl())
+    return entry['data']
+
+
+def invalidate_results(poll_id):
+    cache.delete(RESULTS_KEY.format(poll_id))
+
+
+def get_results(poll_id):
+    """Payload dei risultati (vedi get_entry)."""
+    return get_entry(poll_id)['data']
+
+
+def get_entry(poll_id):
+    """
+    Restituisce la voce dei risultati dalla cache; in caso di miss solo una
+    richiesta alla volta ricalcola la chiave, le altre attendono che venga
+    riempita. Solleva Http404 se il sondaggio non esiste o non è attivo.
+    """
+    key = RESULTS_KEY.format(poll_id)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock = LOCK_KEY.format(poll_id)
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            data = _load(poll_id)
+            cache.set(key, data, _ttl())
+            return data
+        finally:
+            cache.delete(lock)
+
+    # Un'altra richiesta sta ricalcolando: attende il risultato
+    for _ in range(WAIT_ATTEMPTS):
+        time.sleep(WAIT_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return _load(poll_id)
+
+
+async def _aload(poll_id):
+    snapshot = await PollResultSnapshot.objects.filter(FINAL_OR_ACTIVE, poll_id=poll_id).afirst()
+    if snapshot is None:
+        # Snapshot mancante (raro): stesso percorso della versione sincrona
+        return await sync_to_async(_load)(poll_id)
+    return _entry(snapshot)
+
+
+async def aget_entry(poll_id):
+    """Come get_entry, per le viste async: le attese non bloccano l'event loop."""
+    key = RESULTS_KEY.format(poll_id)
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+
+    lock = LOCK_KEY.format(poll_id)
+    if await cache.aadd(lock, 1, LOCK_TIMEOUT):
+        try:
+            data = await _aload(poll_id)
+            await cache.aset(key, data, _ttl())
+            return data
+        finally:
+            await cache.adelete(lock)
+
+    for _ in range(WAIT_ATTEMPTS):
+        await asyncio.sleep(WAIT_INTERVAL)
+        data = await cache.aget(key)
+        if data is not None:
+            return data
+    return await _aload(poll_id)
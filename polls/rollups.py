@@ -0,0 +1,155 @@
+"""
+Rollup dei voti nel tempo (VoteRollup) per la timeline dei sondaggi.
+
+Ogni voto incrementa la riga al minuto di (sondaggio, scelta) nella stessa
+transazione che lo registra, con un upsert ``INSERT ... ON CONFLICT DO
+UPDATE`` (SQLite e PostgreSQL): nessuna lettura, nessuna corsa tra
+richieste concorrenti. ``compact`` unisce le righe al minuto più vecchie
+di MINUTE_RETENTION in righe orarie. La timeline legge un solo intervallo
+dell'indice (poll, bucket) e raggruppa in Python.
+"""
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import ArchivedVote, Vote, VoteRollup
+
+DEFAULTS = {
+    'MINUTE_RETENTION_HOURS': 48,
+    'MAX_BUCKETS': 1000,
+}
+
+GRANULARITIES = {
+    'minute': datetime.timedelta(minutes=1),
+    'hour': datetime.timedelta(hours=1),
+    'day': datetime.timedelta(days=1),
+}
+# Finestra di default della timeline per granularità
+DEFAULT_SPAN = {'minute': 60, 'hour': 48, 'day': 30}
+
+UTC = datetime.timezone.utc
+
+
+def get_setting(name):
+    return getattr(settings, 'VOTE_ROLLUPS', {}).get(name, DEFAULTS[name])
+
+
+def truncate(value, granularity):
+    value = value.astimezone(UTC).replace(second=0, microsecond=0)
+    if granularity in ('hour', 'day'):
+        value = value.replace(minute=0)
+    if granularity == 'day':
+        value = value.replace(hour=0)
+    return value
+
+
+def _upsert(rows):
+    """Somma ``votes`` alle righe (poll_id, choice_id, granularity, bucket, votes), creandole se mancano."""
+    if not rows:
+        return
+    table = connection.ops.quote_name(VoteRollup._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (poll_id, choice_id, granularity, bucket, votes) VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT (poll_id, bucket, granularity, choice_id) DO UPDATE SET votes = {table}.votes + excluded.votes'
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (poll_id, choice_id, granularity, adapt(bucket), votes)
+            for poll_id, choice_id, granularity, bucket, votes in rows
+        ])
+
+
+def record(votes):
+    """
+    Aggiunge ai rollup al minuto i voti appena inseriti.
+    Va chiamata nella stessa transazione che crea i voti.
+    """
+    buckets = Counter((v.poll_id, v.choice_id, truncate(v.voted_at, 'minute')) for v in votes)
+    _upsert([
+        (poll_id, choice_id, VoteRollup.MINUTE, bucket, n)
+        for (poll_id, choice_id, bucket), n in buckets.items()
+    ])
+
+
+def compact(before=None):
+    """
+    Unisce le righe al minuto precedenti a ``before`` (default: ora meno
+    MINUTE_RETENTION_HOURS, arrotondato all'ora) in righe orarie.
+    Restituisce il numero di righe al minuto rimosse.
+    """
+    if before is None:
+        before = timezone.now() - datetime.timedelta(hours=get_setting('MINUTE_RETENTION_HOURS'))
+    before = truncate(before, 'hour')
+
+    with transaction.atomic():
+        minutes = VoteRollup.objects.filter(granularity=VoteRollup.MINUTE, bucket__lt=before)
+        merged = (
+            minutes.order_by()
+            .annotate(hour=TruncHour('bucket', tzinfo=UTC))
+            .values('poll_id', 'choice_id', 'hour')
+            .annotate(n=Sum('votes'))
+        )
+        _upsert([
+            (row['poll_id'], row['choice_id'], VoteRollup.HOUR, row['hour'], row['n'])
+            for row in merged
+        ])
+        deleted, _ = minutes.delete()
+    return deleted
+
+
+def rebuild(poll_ids=None):
+    """Ricostruisce i rollup al minuto da votes e archived_votes (poi va compattato)."""
+    with transaction.atomic():
+        rollups = VoteRollup.objects.all()
+        if poll_ids is not None:
+            rollups = rollups.filter(poll_id__in=poll_ids)
+        rollups.delete()
+        for model in (Vote, ArchivedVote):
+            votes = model.objects.all()
+            if poll_ids is not None:
+                votes = votes.filter(poll_id__in=poll_ids)
+            grouped = (
+                votes.order_by()
+                .annotate(minute=TruncMinute('voted_at', tzinfo=UTC))
+                .values('poll_id', 'choice_id', 'minute')
+                .annotate(n=Count('pk'))
+            )
+            _upsert([
+                (row['poll_id'], row['choice_id'], VoteRollup.MINUTE, row['minute'], row['n'])
+                for row in grouped.iterator()
+            ])
+
+
+def timeline(poll_id, granularity='hour', since=None, until=None):
+    """
+    Voti per intervallo e scelta: [{'bucket', 'total', 'choices': {id: voti}}].
+    Con granularità al minuto contano solo le righe non ancora compattate.
+    """
+    step = GRANULARITIES[granularity]
+    until = until or timezone.now()
+    since = since or until - step * DEFAULT_SPAN[granularity]
+    # Limite alla dimensione della risposta
+    since = max(since, until - step * get_setting('MAX_BUCKETS'))
+
+    rows = VoteRollup.objects.filter(
+        poll_id=poll_id, bucket__gte=truncate(since, granularity), bucket__lt=until
+    ).order_by('bucket')
+    if granularity == 'minute':
+        rows = rows.filter(granularity=VoteRollup.MINUTE)
+
+    points = {}
+    for bucket, choice_id, votes in rows.values_list('bucket', 'choice_id', 'votes'):
+        point = points.setdefault(truncate(bucket, granularity), {'total': 0, 'choices': Counter()})
+        point['total'] += votes
+        point['choices'][choice_id] += votes
+
+    return [
+        {'bucket': bucket, 'total': point['total'], 'choices': dict(point['choices'])}
+        for bucket, point in points.items()
+    ]
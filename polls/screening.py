@@ -0,0 +1,129 @@
+"""
+Screening dei voti prima del database.
+
+Due strutture in memoria, limitate e per processo:
+
+- un LRU delle coppie (poll, user) che hanno già votato: un voto ripetuto
+  viene rifiutato senza interrogare il database;
+- per ogni coppia (IP, poll) una finestra scorrevole dei voti recenti:
+  oltre FLAG_AFTER il voto viene accettato ma segnalato in FlaggedVote,
+  oltre BLOCK_AFTER viene rifiutato (429).
+
+Le strutture sono solo un filtro veloce: un miss (altro worker, riavvio,
+voce espulsa dall'LRU) ricade sul controllo nel database e sul vincolo
+unique (user, poll), che restano la garanzia. Nell'LRU entrano solo voti
+già registrati nel database (mai quelli ancora in coda write-behind, che
+potrebbero essere scartati).
+
+Disattivo di default: la finestra per IP ha senso solo se client_ip vede
+l'IP reale del votante (dietro un proxy serve TRUST_X_FORWARDED_FOR).
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .models import FlaggedVote
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SEEN_MAX_ENTRIES': 100000,
+    'TRACKED_MAX_ENTRIES': 50000,
+    'WINDOW_SECONDS': 60,
+    'FLAG_AFTER': 20,
+    'BLOCK_AFTER': 60,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'VOTE_SCREENING', {}).get(name, DEFAULTS[name])
+
+
+@dataclass
+class Verdict:
+    duplicate: bool = False
+    blocked: bool = False
+    flagged: bool = False
+    # Voti dallo stesso IP sul sondaggio nella finestra (compreso questo)
+    window_count: int = 0
+    retry_after: float = 0
+    # Il rifiuto va registrato (solo il primo della finestra, per limitare le scritture)
+    record_block: bool = False
+
+
+class VoteScreen:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._seen = OrderedDict()
+        self._windows = OrderedDict()
+
+    def remember(self, poll_id, user_id):
+        """Registra che ``user_id`` ha votato in ``poll_id`` (voto già nel database)."""
+        key = (poll_id, user_id)
+        with self._lock:
+            self._seen[key] = True
+            self._seen.move_to_end(key)
+            if len(self._seen) > get_setting('SEEN_MAX_ENTRIES'):
+                self._seen.popitem(last=False)
+
+    def screen(self, poll_id, user_id, ip_address, now=None):
+        """Valuta un tentativo di voto; aggiorna la finestra dell'IP."""
+        now = now or time.monotonic()
+        window = get_setting('WINDOW_SECONDS')
+        block_after = get_setting('BLOCK_AFTER')
+
+        with self._lock:
+            if (poll_id, user_id) in self._seen:
+                self._seen.move_to_end((poll_id, user_id))
+                return Verdict(duplicate=True)
+            if ip_address is None:
+                return Verdict()
+
+            key = (ip_address, poll_id)
+            entry = self._windows.get(key)
+            if entry is None:
+                # [timestamp dei voti nella finestra, ultimo rifiuto registrato]
+                entry = self._windows[key] = [deque(), None]
+                if len(self._windows) > get_setting('TRACKED_MAX_ENTRIES'):
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+
+            stamps = entry[0]
+            while stamps and stamps[0] <= now - window:
+                stamps.popleft()
+
+            if len(stamps) >= block_after:
+                # I tentativi rifiutati non allungano la finestra
+                record = entry[1] is None or entry[1] <= now - window
+                if record:
+                    entry[1] = now
+                return Verdict(
+                    blocked=True, window_count=len(stamps) + 1,
+                    retry_after=stamps[0] + window - now, record_block=record,
+                )
+
+            stamps.append(now)
+            return Verdict(flagged=len(stamps) > get_setting('FLAG_AFTER'), window_count=len(stamps))
+
+
+screen = VoteScreen()
+
+
+def flag(poll_id, user_id, ip_address, verdict, vote=None):
+    """Scrive la segnalazione per la revisione (voto accettato o rifiutato)."""
+    return FlaggedVote.objects.create(
+        poll_id=poll_id,
+        user_id=user_id,
+        vote=vote,
+        ip_address=ip_address,
+        reason=FlaggedVote.REASON_IP_BURST,
+        action=FlaggedVote.ACTION_REJECTED if verdict.blocked else FlaggedVote.ACTION_ACCEPTED,
+        window_count=verdict.window_count,
+    )
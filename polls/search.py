@@ -0,0 +1,84 @@
+"""
+Ricerca full-text dei sondaggi (``GET /api/polls/?q=``).
+
+L'indice è la tabella ``polls_search`` creata dalla migrazione 0008 e
+aggiornata da trigger su ``polls`` e ``choices`` (quindi anche da
+bulk_create e update()): su SQLite una tabella virtuale FTS5, su
+PostgreSQL una colonna tsvector generata con indice GIN. Il modello non
+gestito PollSearchIndex la espone all'ORM; qui ci sono il lookup
+``match`` e il punteggio, tradotti per i due backend.
+
+La query dell'utente viene ridotta a parole (ricerca per prefisso, tutte
+obbligatorie): nessun operatore della sintassi FTS arriva al database.
+"""
+import re
+
+from django.db import NotSupportedError, models
+
+WORD = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+# Pesi di titolo, descrizione e testo delle scelte
+SQLITE_RANK = 'bm25("polls_search", 10.0, 4.0, 1.0)'
+POSTGRES_CONFIG = 'simple'
+
+
+def terms(query):
+    return WORD.findall(query or '')[:MAX_TERMS]
+
+
+def fts5_query(query):
+    return ' '.join(f'"{term}"*' for term in terms(query))
+
+
+def tsquery(query):
+    return ' & '.join(f'{term}:*' for term in terms(query))
+
+
+class SearchDocumentField(models.TextField):
+    """
+    Documento indicizzato: su SQLite la colonna nascosta di FTS5 che ha il
+    nome della tabella, su PostgreSQL la colonna tsvector
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(f"Ricerca full-text non disponibile su {connection.vendor}")
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f'{lhs} MATCH %s', [*lhs_params, fts5_query(self.rhs)]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('{POSTGRES_CONFIG}', %s)", [*lhs_params, tsquery(self.rhs)]
+
+
+class SearchRank(models.Expression):
+    """Punteggio di pertinenza: valori più bassi = risultati migliori (su entrambi i backend)"""
+    output_field = models.FloatField()
+
+    def __init__(self, query):
+        super().__init__()
+        self.query = query
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(f"Ricerca full-text non disponibile su {connection.vendor}")
+
+    def as_sqlite(self, compiler, connection):
+        return SQLITE_RANK, []
+
+    def as_postgresql(self, compiler, connection):
+        return (
+            f"-ts_rank(\"polls_search\".\"polls_search\", to_tsquery('{POSTGRES_CONFIG}', %s))",
+            [tsquery(self.query)],
+        )
+
+
+def search_polls(queryset, query):
+    """Filtra un queryset di Poll sulla ricerca e aggiunge il punteggio ``rank``."""
+    return queryset.filter(search_index__document__match=query).annotate(rank=SearchRank(query))
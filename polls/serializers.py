@@ -1,5 +1,10 @@
+import abc
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Poll, Choice, Vote
+from . import snapshots
+from .models import Poll, Choice, Vote, PollResultSnapshot
 from users.models import CustomUser
 
 
@@ -7,6 +12,7 @@ class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Choice
         fields = ['id', 'text', 'votes_count']
+        read_only_fields = ['votes_count']
 
 
 class PollListSerializer(serializers.ModelSerializer):
@@ -23,7 +29,7 @@ class PollListSerializer(serializers.ModelSerializer):
 
 class PollDetailSerializer(serializers.ModelSerializer):
     """Serializer per dettaglio sondaggio (con scelte)"""
-    choices = ChoiceSerializer(many=True, read_only=True)
+    choices = serializers.SerializerMethodField()
     created_by = serializers.StringRelatedField()
 
     class Meta:
@@ -33,6 +39,18 @@ class PollDetailSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'expires_at',
             'total_votes', 'is_active', 'is_expired', 'choices'
         ]
+        read_only_fields = ['total_votes']
+
+    def get_choices(self, poll):
+        # Scelte e voti dallo snapshot precalcolato (niente query sulle scelte)
+        try:
+            snapshot = poll.results_snapshot
+        except PollResultSnapshot.DoesNotExist:
+            snapshot = snapshots.get_or_refresh(poll.pk)
+        return [
+            {'id': row['id'], 'text': row['choice'], 'votes_count': row['votes']}
+            for row in snapshot.results
+        ]
 
 
 class PollCreateSerializer(serializers.ModelSerializer):
@@ -40,7 +58,8 @@ class PollCreateSerializer(serializers.ModelSerializer):
     choices = serializers.ListField(
         child=serializers.CharField(max_length=200),
         min_length=2,
-        max_length=10
+        max_length=10,
+        write_only=True
     )
 
     class Meta:
@@ -49,34 +68,161 @@ class PollCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         choices_data = validated_data.pop('choices')
-        poll = Poll.objects.create(**validated_data)
-
-        # Crea le scelte
-        for choice_text in choices_data:
-            Choice.objects.create(poll=poll, text=choice_text)
-
+        with transaction.atomic():
+            poll = Poll.objects.create(**validated_data)
+            # Un solo INSERT per tutte le scelte; bulk_create non invia post_save,
+            # quindi lo snapshot dei risultati si calcola una volta sola
+            Choice.objects.bulk_create([Choice(poll=poll, text=text) for text in choices_data])
+            poll.results_snapshot, = snapshots.refresh([poll.pk])
         return poll
 
+    def to_representation(self, instance):
+        # Risposta come il dettaglio, con le scelte dallo snapshot appena scritto.
+        # choices è solo in scrittura: la ListField non sa serializzare il related manager
+        return PollDetailSerializer(instance, context=self.context).data
+
 
 class VoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vote
         fields = ['choice', 'voted_at']
 
+    def validate_choice(self, choice):
+        # vote_poll passa il sondaggio dell'URL: la scelta deve appartenergli
+        poll = self.context.get('poll')
+        if poll is not None and choice.poll_id != poll.id:
+            raise serializers.ValidationError("La scelta non appartiene a questo sondaggio.")
+        return choice
+
     def create(self, validated_data):
         user = self.context['request'].user
 
         if user.is_anonymous:
             raise serializers.ValidationError("Autenticazione richiesta per votare.")
 
-        choice = validated_data['choice']
-        poll = choice.poll
-
-        # Impedisce di votare più volte sullo stesso sondaggio
-        if Vote.objects.filter(poll=poll, user=user).exists():
-            raise serializers.ValidationError("Hai già votato per questo sondaggio.")
-
-        validated_data['poll'] = poll
+        # Il doppio voto è impedito dal vincolo unique (user, poll)
+        if 'poll' not in validated_data:
+            validated_data['poll'] = validated_data['choice'].poll
         validated_data['user'] = user
 
         return super().create(validated_data)
+
+
+class VoteListSerializer(serializers.ModelSerializer):
+    """Serializer per lo storico dei voti di un sondaggio"""
+    user = serializers.StringRelatedField()
+
+    class Meta:
+        model = Vote
+        fields = ['id', 'user', 'choice', 'voted_at']
+
+
+class BulkVoteSerializer(serializers.Serializer):
+    """Singolo voto di un import massivo (validato poi in blocco da polls.bulk)"""
+    user = serializers.IntegerField(min_value=1)
+    poll = serializers.IntegerField(min_value=1)
+    choice = serializers.IntegerField(min_value=1)
+    ip_address = serializers.IPAddressField(required=False, allow_null=True)
+
+
+class TimelinePointSerializer(serializers.Serializer):
+    """Un intervallo di poll_timeline (bucket nel fuso di TIME_ZONE, come le altre date)"""
+    bucket = serializers.DateTimeField()
+    total = serializers.IntegerField()
+    choices = serializers.DictField(child=serializers.IntegerField())
+
+
+# Serializer veloci (opt-in con POLL_FAST_SERIALIZERS): lavorano su righe
+# .values() e costruiscono dict semplici, senza l'introspezione dei campi di
+# ModelSerializer. L'output è identico a quello dei serializer qui sopra.
+
+_datetime = serializers.DateTimeField()
+
+
+def _format_datetime(value):
+    return _datetime.to_representation(value) if value is not None else None
+
+
+class ValuesSerializer(abc.ABC):
+    """
+    Serializer di sola lettura per righe ``.values()`` (stessa interfaccia di .data)
+    Le sottoclassi indicano values_fields e implementano to_representation
+    """
+    values_fields = ()
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.values_fields)
+
+    @abc.abstractmethod
+    def to_representation(self, row):
+        """Dict della risposta per una riga di ``values()``"""
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+class ChoiceFastSerializer(ValuesSerializer):
+    values_fields = ('id', 'text', 'votes_count')
+
+    def to_representation(self, row):
+        return {'id': row['id'], 'text': row['text'], 'votes_count': row['votes_count']}
+
+
+class PollListFastSerializer(ValuesSerializer):
+    """Come PollListSerializer; updated_at serve solo all'ETag della pagina"""
+    values_fields = (
+        'id', 'title', 'description', 'created_by__username',
+        'created_at', 'updated_at', 'expires_at', 'total_votes', 'is_active'
+    )
+
+    def to_representation(self, row):
+        expires_at = row['expires_at']
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'created_by': row['created_by__username'],
+            'created_at': _format_datetime(row['created_at']),
+            'total_votes': row['total_votes'],
+            'is_active': row['is_active'],
+            'is_expired': expires_at is not None and timezone.now() > expires_at,
+        }
+
+
+class PollDetailFastSerializer(ValuesSerializer):
+    """Come PollDetailSerializer: le scelte arrivano dallo snapshot in JOIN"""
+    values_fields = (
+        'id', 'title', 'description', 'created_by__username',
+        'created_at', 'updated_at', 'expires_at', 'total_votes', 'is_active',
+        'results_snapshot__results'
+    )
+
+    def to_representation(self, row):
+        results = row['results_snapshot__results']
+        if results is None:
+            results = snapshots.get_or_refresh(row['id']).results
+        expires_at = row['expires_at']
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'created_by': row['created_by__username'],
+            'created_at': _format_datetime(row['created_at']),
+            'updated_at': _format_datetime(row['updated_at']),
+            'expires_at': _format_datetime(expires_at),
+            'total_votes': row['total_votes'],
+            'is_active': row['is_active'],
+            'is_expired': expires_at is not None and timezone.now() > expires_at,
+            'choices': [
+                {'id': item['id'], 'text': item['choice'], 'votes_count': item['votes']}
+                for item in results
+            ],
+        }
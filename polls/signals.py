@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import results_cache, snapshots, trending
+from .models import Poll, Choice
+from .pubsub import broker
+
+# Inviato dopo il commit di uno o più voti (argomenti: poll_id, votes opzionale, default 1)
+vote_committed = Signal()
+
+
+@receiver(vote_committed)
+def publish_poll_results(sender, poll_id, **kwargs):
+    # Write-through della cache, poi un solo payload per tutti i sottoscrittori
+    data = results_cache.refresh_results(poll_id)
+    if data is not None:
+        broker.publish(poll_id, data)
+
+
+@receiver(vote_committed)
+def update_trending(sender, poll_id, votes=1, **kwargs):
+    trending.tracker.record(poll_id, votes)
+
+
+def _refresh_after_commit(poll_id):
+    def refresh():
+        snapshots.refresh([poll_id])
+        results_cache.invalidate_results(poll_id)
+    # Dopo il commit: in una cancellazione a cascata il sondaggio non esiste più
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Poll)
+def refresh_poll_results(sender, instance, created, **kwargs):
+    # Titolo o stato modificati (es. is_active da admin o PUT)
+    if not created:
+        _refresh_after_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Poll)
+def invalidate_poll_results(sender, instance, **kwargs):
+    results_cache.invalidate_results(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def refresh_choice_results(sender, instance, **kwargs):
+    _refresh_after_commit(instance.poll_id)
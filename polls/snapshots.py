@@ -0,0 +1,61 @@
+"""
+Snapshot materializzati dei risultati (PollResultSnapshot).
+
+Lo snapshot viene ricalcolato dai contatori denormalizzati (due letture
+indicizzate per gruppo di sondaggi) e scritto con un solo upsert, nella
+stessa transazione che registra i voti.
+"""
+from .models import Poll, Choice, PollResultSnapshot
+
+
+def percentage(votes, total):
+    if total > 0:
+        return round((votes / total) * 100, 1)
+    return 0
+
+
+def compute(poll_ids):
+    """Costruisce (senza salvarli) gli snapshot per i sondaggi indicati."""
+    rows = {}
+    for choice in Choice.objects.filter(poll_id__in=poll_ids).values('id', 'poll_id', 'text', 'votes_count'):
+        rows.setdefault(choice['poll_id'], []).append(choice)
+
+    snapshots = []
+    for poll in Poll.objects.filter(pk__in=poll_ids).order_by().values('id', 'title', 'total_votes'):
+        total = poll['total_votes']
+        snapshots.append(PollResultSnapshot(
+            poll_id=poll['id'],
+            title=poll['title'],
+            total_votes=total,
+            results=[
+                {
+                    'id': choice['id'],
+                    'choice': choice['text'],
+                    'votes': choice['votes_count'],
+                    'percentage': percentage(choice['votes_count'], total),
+                }
+                for choice in rows.get(poll['id'], [])
+            ],
+        ))
+    return snapshots
+
+
+def refresh(poll_ids):
+    """Ricalcola e salva gli snapshot; restituisce quelli scritti."""
+    snapshots = compute(poll_ids)
+    PollResultSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['poll'],
+        update_fields=['title', 'total_votes', 'results', 'updated_at'],
+    )
+    return snapshots
+
+
+def get_or_refresh(poll_id):
+    """Snapshot di un sondaggio, creato al volo se manca."""
+    snapshot = PollResultSnapshot.objects.filter(poll_id=poll_id).first()
+    if snapshot is None:
+        snapshots = refresh([poll_id])
+        snapshot = snapshots[0] if snapshots else None
+    return snapshot
@@ -1,3 +1,1116 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import json
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from polling_project import metrics
+from polling_project.middleware import PerformanceMiddleware
+from users import dashboard
+
+from . import bulk, expiry, export, idempotency, rollups, screening, snapshots, trending, views, writebehind
+from .counters import rebuild_counters
+from .models import ArchivedVote, FlaggedVote, IdempotencyKey, Poll, PollTrendingScore, Choice, Vote, VoteRollup
+from .pubsub import broker
+from .ratelimit import client_ip
+from .renderers import FastJSONRenderer
+
+
+@override_settings(REGISTER_RATE_LIMIT={'CAPACITY': 10, 'REFILL_SECONDS': 60})
+class RegisterTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('register')
+
+    def register(self, **data):
+        return self.client.post(self.url, {'password': 'pw-segreta', **data}, format='json')
+
+    def test_register_normalizes_input(self):
+        response = self.register(username='\uff41lice', email='Alice@EXAMPLE.com')
+        self.assertEqual(response.status_code, 201)
+        user = get_user_model().objects.get()
+        self.assertEqual((user.username, user.email), ('alice', 'Alice@example.com'))
+        self.assertTrue(user.check_password('pw-segreta'))
+        # Senza email: più utenti con email NULL
+        self.assertEqual(self.register(username='bob').status_code, 201)
+        self.assertEqual(self.register(username='carol', email='').status_code, 201)
+
+    def test_invalid_fields(self):
+        response = self.register(username='nome non valido!')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json()['fields'])
+        response = self.register(username='dave', email='non-una-email')
+        self.assertIn('email', response.json()['fields'])
+        self.assertEqual(self.register(username=['dave']).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'x', content_type='application/json').status_code, 400)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_duplicates_from_database_constraints(self):
+        self.register(username='alice', email='alice@example.com')
+        response = self.register(username='alice', email='other@example.com')
+        self.assertEqual((response.status_code, response.json()['error']), (400, 'Username già registrato'))
+        response = self.register(username='alice2', email='alice@EXAMPLE.com')
+        self.assertEqual((response.status_code, response.json()['error']), (400, 'Email già registrata'))
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    @override_settings(REGISTER_RATE_LIMIT={'CAPACITY': 2, 'REFILL_SECONDS': 60})
+    def test_rate_limit(self):
+        self.assertEqual(self.register(username='a').status_code, 201)
+        self.assertEqual(self.register(username='b').status_code, 201)
+        response = self.register(username='c')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Altro IP, altro secchio
+        response = self.client.post(
+            self.url, {'username': 'c', 'password': 'pw'}, format='json', REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class ClientIPTests(SimpleTestCase):
+
+    def ip(self, forwarded=None):
+        extra = {'HTTP_X_FORWARDED_FOR': forwarded} if forwarded is not None else {}
+        return client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', **extra))
+
+    def test_forwarded_ignored_by_default(self):
+        self.assertEqual(self.ip('203.0.113.7'), '10.0.0.1')
+
+    @override_settings(TRUST_X_FORWARDED_FOR=True, TRUSTED_PROXY_COUNT=1)
+    def test_rightmost_entry_per_trusted_proxy(self):
+        # L'elemento più a sinistra lo sceglie il client
+        self.assertEqual(self.ip('1.2.3.4, 203.0.113.7'), '203.0.113.7')
+        with self.settings(TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(self.ip('1.2.3.4, 203.0.113.7, 10.0.0.9'), '203.0.113.7')
+            self.assertEqual(self.ip('203.0.113.7'), '10.0.0.1')
+        self.assertEqual(self.ip(' 2001:db8::1 '), '2001:db8::1')
+
+    @override_settings(TRUST_X_FORWARDED_FOR=True)
+    def test_invalid_entry_falls_back_to_remote_addr(self):
+        self.assertEqual(self.ip('non-un-ip'), '10.0.0.1')
+        self.assertEqual(self.ip(''), '10.0.0.1')
+        self.assertEqual(self.ip(), '10.0.0.1')
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Budget fisso di query per endpoint: il numero di query non deve
+    crescere con il numero di sondaggi, scelte o voti.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pw')
+            for i in range(5)
+        ]
+        for i in range(25):
+            poll = Poll.objects.create(title=f'Poll {i}', created_by=cls.users[i % 5])
+            choices = [Choice.objects.create(poll=poll, text=f'Choice {j}') for j in range(4)]
+            for user in cls.users[:3]:
+                Vote.objects.create(user=user, poll=poll, choice=choices[0])
+        rebuild_counters()
+        snapshots.refresh(Poll.objects.values_list('pk', flat=True))
+        for user in cls.users:
+            dashboard.rebuild(user.pk)
+        cls.poll = Poll.objects.first()
+        cls.voter = cls.users[4]
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+
+    def authenticate(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_poll_list(self):
+        # Paginazione a cursore: una sola query, con created_by in JOIN
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('poll-list-create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_poll_detail(self):
+        # validatori ETag, poi sondaggio con created_by e snapshot in JOIN
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('poll-detail', args=[self.poll.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['choices']), 4)
+
+    def test_poll_results(self):
+        # Miss della cache: una lettura dello snapshot per chiave primaria
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('poll-results', args=[self.poll.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_votes'], 3)
+        # Letture successive servite interamente dalla cache
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('poll-results', args=[self.poll.pk]))
+        self.assertEqual(response.data['total_votes'], 3)
+
+    def test_poll_votes(self):
+        self.authenticate(self.poll.created_by)
+        # utente, sondaggio, pagina di voti con user in JOIN
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('poll-votes', args=[self.poll.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_create_poll(self):
+        self.authenticate(self.voter)
+        data = {'title': 'New', 'choices': [f'Choice {i}' for i in range(10)]}
+        # utente, insert del sondaggio, un insert per tutte le scelte, snapshot (due letture
+        # e upsert), contatore dell'autore con F(), dashboard dell'autore (lettura e update),
+        # quattro savepoint: non cresce con le scelte
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse('poll-list-create'), data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['choices']), 10)
+
+    def test_vote(self):
+        self.authenticate(self.voter)
+        choice = self.poll.choices.first()
+        # 17 query, nessuna che cresca con scelte, voti o sondaggi:
+        #  - lettura: utente, sondaggio, controllo duplicati, scelta (4)
+        #  - transazione del voto: savepoint e release, insert del voto (3)
+        #  - contatori con F() di scelta, sondaggio e votante (3)
+        #  - rollup: un upsert per tutte le granularità (1)
+        #  - dashboard: lock dei riepiloghi, voti ricevuti del creatore,
+        #    upsert degli ultimi voti (3)
+        #  - snapshot dei risultati: scelte, totali del sondaggio, upsert (3)
+        # Rollup, dashboard e snapshot restano nella transazione invece che in
+        # on_commit: altrimenti un crash dopo il commit lascerebbe il voto senza
+        # i dati derivati, recuperabili solo con i comandi di ricostruzione
+        with self.assertNumQueries(17):
+            response = self.client.post(
+                reverse('poll-vote', args=[self.poll.pk]), {'choice': choice.pk}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+
+class RebuildCountersTests(APITestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pw')
+            for i in range(2)
+        ]
+        self.live = Poll.objects.create(title='Attivo', created_by=self.users[0])
+        self.archived = Poll.objects.create(title='Archiviato', created_by=self.users[0])
+        for poll in (self.live, self.archived):
+            choice = Choice.objects.create(poll=poll, text='A')
+            Choice.objects.create(poll=poll, text='B')
+            for user in self.users:
+                Vote.objects.create(user=user, poll=poll, choice=choice)
+        expiry.archive_votes([self.archived.pk])
+
+    def test_command_restores_counters(self):
+        Choice.objects.update(votes_count=99)
+        Poll.objects.update(total_votes=-1)
+        get_user_model().objects.update(votes_cast=42)
+
+        out = io.StringIO()
+        call_command('rebuild_vote_counters', stdout=out)
+        self.assertIn('Contatori ricostruiti', out.getvalue())
+        # Voti vivi più quelli archiviati
+        for poll in (self.live, self.archived):
+            poll.refresh_from_db()
+            self.assertEqual(poll.total_votes, 2)
+            self.assertEqual(sorted(poll.choices.values_list('votes_count', flat=True)), [0, 2])
+        self.assertEqual(set(get_user_model().objects.values_list('votes_cast', flat=True)), {2})
+        self.assertEqual(self.archived.results_snapshot.results[0]['votes'], 2)
+
+    def test_single_poll(self):
+        Poll.objects.update(total_votes=0)
+        call_command('rebuild_vote_counters', f'--poll={self.live.pk}', stdout=io.StringIO())
+        self.assertEqual(dict(Poll.objects.values_list('pk', 'total_votes')), {self.live.pk: 2, self.archived.pk: 0})
+
+
+class ResultsCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=self.owner)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+        Choice.objects.create(poll=self.poll, text='B')
+
+    def vote_and_read(self):
+        url = reverse('poll-results', args=[self.poll.pk])
+        self.assertEqual(self.client.get(url).data['total_votes'], 0)
+
+        token = RefreshToken.for_user(self.voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json')
+        self.client.credentials()
+
+        # La cache è stata riscritta dal voto: nessuna query e dati aggiornati
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_votes'], 1)
+        self.assertEqual(response.data['results'][0]['percentage'], 100.0)
+
+    def test_locmem_backend(self):
+        self.vote_and_read()
+
+    def test_filebased_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={**settings.CACHES, 'default': backend}):
+                self.vote_and_read()
+
+    def test_missing_poll(self):
+        self.assertEqual(self.client.get(reverse('poll-results', args=[999])).status_code, 404)
+
+
+class ResultsStreamTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=self.owner)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+        Choice.objects.create(poll=self.poll, text='B')
+
+    def vote(self):
+        token = RefreshToken.for_user(self.voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    async def next_event(self, stream):
+        chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+        self.assertTrue(chunk.startswith('event: results\ndata: '))
+        return json.loads(chunk.split('data: ', 1)[1])
+
+    async def test_events_after_vote(self):
+        url = reverse('poll-results-stream', args=[self.poll.pk])
+        response = await views.poll_results_stream(AsyncRequestFactory().get(url), poll_id=self.poll.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual((await self.next_event(stream))['total_votes'], 0)
+        self.assertEqual(broker.subscriber_count(self.poll.pk), 1)
+
+        # Il voto confermato viene pubblicato a chi è in ascolto
+        await sync_to_async(self.vote)()
+        data = await self.next_event(stream)
+        self.assertEqual(data['total_votes'], 1)
+        self.assertEqual(data['results'][0]['votes'], 1)
+
+        await stream.aclose()
+
+    def test_not_served_under_wsgi(self):
+        response = self.client.get(reverse('poll-results-stream', args=[self.poll.pk]))
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(broker.subscriber_count(self.poll.pk), 0)
+
+    async def test_missing_poll(self):
+        with self.assertRaises(Http404):
+            await views.poll_results_stream(AsyncRequestFactory().get('/'), poll_id=999)
+        self.assertEqual(broker.subscriber_count(999), 0)
+
+
+class BulkVoteTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', password='pw', is_staff=True)
+        self.voters = [
+            User.objects.create_user(username=f'voter{i}', email=f'voter{i}@example.com', password='pw')
+            for i in range(3)
+        ]
+        self.poll = Poll.objects.create(title='Poll', created_by=self.staff)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+        self.other = Choice.objects.create(poll=Poll.objects.create(title='Altro', created_by=self.staff), text='X')
+        self.url = reverse('poll-votes-bulk')
+
+    def post(self, items, user=None):
+        token = RefreshToken.for_user(user or self.staff).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, items, format='json')
+
+    def item(self, voter, choice=None):
+        return {'user': voter.pk, 'poll': self.poll.pk, 'choice': (choice or self.choice).pk}
+
+    def assertCountersMatchVotes(self):
+        self.poll.refresh_from_db()
+        self.choice.refresh_from_db()
+        votes = Vote.objects.filter(poll=self.poll).count()
+        self.assertEqual(self.poll.total_votes, votes)
+        self.assertEqual(self.choice.votes_count, votes)
+
+    def test_staff_only(self):
+        self.assertEqual(self.post([self.item(self.voters[0])], user=self.voters[0]).status_code, 403)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_duplicates_and_errors(self):
+        Vote.objects.create(user=self.voters[0], poll=self.poll, choice=self.choice)
+        rebuild_counters()
+        response = self.post([
+            self.item(self.voters[0]),                # già presente
+            self.item(self.voters[1]),
+            self.item(self.voters[1]),                # ripetuto nella richiesta
+            self.item(self.voters[2], self.other),    # opzione di un altro sondaggio
+            {'user': self.voters[2].pk, 'poll': 999, 'choice': self.choice.pk},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['duplicates'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 4])
+        self.assertCountersMatchVotes()
+        self.assertEqual(get_user_model().objects.get(pk=self.voters[1].pk).votes_cast, 1)
+
+        # Tutto già presente: nessun voto creato
+        response = self.post([self.item(self.voters[1])])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['duplicates'], 1)
+
+    def test_concurrent_vote_is_not_counted(self):
+        # Un voto arriva da un'altra richiesta dopo il controllo dei duplicati:
+        # il primo controllo non lo vede, l'insert fallisce e si riprova
+        Vote.objects.create(user=self.voters[0], poll=self.poll, choice=self.choice)
+        vote_filter = Vote.objects.filter
+        calls = []
+
+        def stale_filter(*args, **kwargs):
+            calls.append(kwargs)
+            return Vote.objects.none() if len(calls) == 1 else vote_filter(*args, **kwargs)
+
+        with mock.patch.object(Vote.objects, 'filter', side_effect=stale_filter):
+            response = self.post([self.item(voter) for voter in self.voters])
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['duplicates'], 1)
+        self.assertEqual(Vote.objects.filter(poll=self.poll).count(), 3)
+        # Il voto concorrente non passa dai contatori: ne contano 2 su 3
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 2)
+
+
+class WriteBehindTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        journal_path = f'{journal_dir.name}/journal.sqlite3'
+        settings_override = override_settings(VOTE_WRITE_BEHIND={
+            **settings.VOTE_WRITE_BEHIND,
+            'ENABLED': True, 'AUTO_FLUSH': False, 'MAX_PENDING': 2, 'JOURNAL_PATH': journal_path,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(lambda: writebehind._local.conns.pop(journal_path).close())
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.voters = [
+            User.objects.create_user(username=f'voter{i}', email=f'voter{i}@example.com', password='pw')
+            for i in range(3)
+        ]
+        self.poll = Poll.objects.create(title='Flash', created_by=self.owner)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+
+    def vote(self, voter):
+        token = RefreshToken.for_user(voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.post(reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json')
+
+    def flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return writebehind.flush()
+
+    def test_enqueue_and_flush(self):
+        self.assertEqual(self.vote(self.voters[0]).status_code, 202)
+        # Il duplicato ignorato non conta nella coda
+        self.assertEqual(self.vote(self.voters[0]).status_code, 400)
+        self.assertEqual(writebehind._pending(), 1)
+        self.assertEqual(self.vote(self.voters[1]).status_code, 202)
+        # Coda piena (MAX_PENDING)
+        self.assertEqual(self.vote(self.voters[2]).status_code, 503)
+        self.assertEqual(writebehind.pending_count(), 2)
+        self.assertFalse(Vote.objects.exists())
+
+        # Il voto registrato tiene l'ora dell'accodamento
+        enqueued_at = datetime.datetime(2026, 1, 1, 12, tzinfo=datetime.timezone.utc)
+        writebehind._connection().execute('UPDATE pending_votes SET enqueued_at = ?', (enqueued_at.isoformat(),))
+        self.assertEqual(self.flush(), 2)
+        self.assertEqual((writebehind.pending_count(), writebehind._pending()), (0, 0))
+        self.assertEqual(set(Vote.objects.values_list('voted_at', flat=True)), {enqueued_at})
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 2)
+
+        # La coda svuotata accetta di nuovo voti
+        self.assertEqual(self.vote(self.voters[2]).status_code, 202)
+
+    def test_replayed_batch_is_idempotent(self):
+        self.vote(self.voters[0])
+        self.vote(self.voters[1])
+        # Crash dopo il commit dei voti ma prima della rimozione dal journal
+        rows = writebehind._connection().execute('SELECT user_id, poll_id, choice_id FROM pending_votes').fetchall()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.ingest_votes([{'user': user, 'poll': poll, 'choice': choice} for user, poll, choice in rows])
+
+        self.assertEqual(self.flush(), 0)
+        self.assertEqual(writebehind.pending_count(), 0)
+        self.assertEqual(Vote.objects.count(), 2)
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 2)
+
+    @override_settings(VOTE_SCREENING={**settings.VOTE_SCREENING, 'ENABLED': True})
+    def test_screening_remembers_only_recorded_votes(self):
+        self.assertEqual(self.vote(self.voters[0]).status_code, 202)
+        # Il sondaggio scade prima dello svuotamento: il voto viene scartato
+        Poll.objects.filter(pk=self.poll.pk).update(expires_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        with self.assertLogs('polls.writebehind', 'WARNING'):
+            self.assertEqual(self.flush(), 0)
+        Poll.objects.filter(pk=self.poll.pk).update(expires_at=None)
+        self.assertEqual(self.vote(self.voters[0]).status_code, 202)
+
+        self.flush()
+        # Ora il voto è registrato: il ripetuto è rifiutato dallo screening
+        self.assertIn((self.poll.pk, self.voters[0].pk), screening.screen._seen)
+        self.assertEqual(self.vote(self.voters[0]).status_code, 400)
+
+    def test_flush_is_exclusive(self):
+        self.vote(self.voters[0])
+        lock = sqlite3.connect(f"{writebehind.get_setting('JOURNAL_PATH')}.lock", isolation_level=None)
+        self.addCleanup(lock.close)
+        lock.execute('BEGIN IMMEDIATE')
+        # Un altro processo sta svuotando la coda
+        self.assertEqual(writebehind.flush(), 0)
+        lock.execute('COMMIT')
+        self.assertEqual(self.flush(), 1)
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=self.owner)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+        snapshots.refresh([self.poll.pk])
+
+    def vote(self):
+        token = RefreshToken.for_user(self.voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json')
+        self.client.credentials()
+
+    def assertRevalidates(self, url, queries):
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Un voto cambia la versione: la risposta completa torna al client
+        self.vote()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_poll_detail(self):
+        self.assertRevalidates(reverse('poll-detail', args=[self.poll.pk]), 1)
+
+    def test_poll_list(self):
+        self.assertRevalidates(reverse('poll-list-create'), 1)
+        # I voti non toccano updated_at: la lista non espone Last-Modified
+        self.assertNotIn('Last-Modified', self.client.get(reverse('poll-list-create')))
+
+    def test_expiry_changes_validators(self):
+        expires_at = timezone.now() + datetime.timedelta(minutes=5)
+        Poll.objects.filter(pk=self.poll.pk).update(expires_at=expires_at)
+        url = reverse('poll-detail', args=[self.poll.pk])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertFalse(response.data['is_expired'])
+
+        # Scaduto senza scritture: nuovo ETag e Last-Modified alla scadenza
+        with mock.patch('django.utils.timezone.now', return_value=expires_at + datetime.timedelta(seconds=1)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['is_expired'])
+            self.assertNotEqual(response['Last-Modified'], last_modified)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_poll_results(self):
+        self.assertRevalidates(reverse('poll-results', args=[self.poll.pk]), 0)
+
+
+class FastSerializerTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user(username='owner', email='owner@example.com', password='pw')
+        for i in range(3):
+            poll = Poll.objects.create(
+                title=f'Poll {i}', description='Città', created_by=owner,
+                expires_at=datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc) if i else None,
+            )
+            Choice.objects.create(poll=poll, text='A')
+            Choice.objects.create(poll=poll, text='B')
+        cls.poll = poll
+
+    def get_both(self, url):
+        slow = self.client.get(url).json()
+        with override_settings(POLL_FAST_SERIALIZERS=True):
+            fast = self.client.get(url).json()
+        return slow, fast
+
+    def test_poll_list_matches(self):
+        slow, fast = self.get_both(reverse('poll-list-create'))
+        self.assertEqual(slow, fast)
+
+    def test_poll_detail_matches(self):
+        slow, fast = self.get_both(reverse('poll-detail', args=[self.poll.pk]))
+        self.assertEqual(slow, fast)
+        self.assertEqual(len(fast['choices']), 2)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_same_output_as_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        data = {
+            'text': 'perché \u2028', 'when': datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'amount': decimal.Decimal('1.50'), 'items': [1, None, True], 1: 'chiave intera',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class ExpirySweepTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pw')
+            for i in range(3)
+        ]
+        past = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        self.expired = Poll.objects.create(title='Scaduto', created_by=self.users[0], expires_at=past)
+        self.live = Poll.objects.create(title='Attivo', created_by=self.users[0])
+        for poll in (self.expired, self.live):
+            choice = Choice.objects.create(poll=poll, text='A')
+            Choice.objects.create(poll=poll, text='B')
+            for user in self.users:
+                Vote.objects.create(user=user, poll=poll, choice=choice)
+        rebuild_counters()
+
+    def test_list_hides_expired_before_sweep(self):
+        titles = [poll['title'] for poll in self.client.get(reverse('poll-list-create')).data['results']]
+        self.assertEqual(titles, ['Attivo'])
+
+    def test_sweep_archives_and_freezes_results(self):
+        vote = Vote.objects.filter(poll=self.expired).first()
+        flag = FlaggedVote.objects.create(
+            poll=self.expired, user=vote.user, vote=vote,
+            reason=FlaggedVote.REASON_IP_BURST, action=FlaggedVote.ACTION_ACCEPTED,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = expiry.sweep(archive=True)
+        self.assertEqual(summary, {'expired': 1, 'archived': 3})
+        self.expired.refresh_from_db()
+        self.assertFalse(self.expired.is_active)
+        self.assertTrue(self.expired.results_snapshot.is_final)
+        self.assertFalse(Vote.objects.filter(poll=self.expired).exists())
+        self.assertEqual(ArchivedVote.objects.filter(poll=self.expired).count(), 3)
+        # La segnalazione resta, staccata dal voto archiviato
+        flag.refresh_from_db()
+        self.assertIsNone(flag.vote_id)
+
+        # I risultati definitivi restano consultabili
+        response = self.client.get(reverse('poll-results', args=[self.expired.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_votes'], 3)
+
+        # I contatori ricostruiti tengono conto dei voti archiviati
+        rebuild_counters()
+        self.expired.refresh_from_db()
+        self.assertEqual(self.expired.total_votes, 3)
+        self.assertEqual(get_user_model().objects.get(pk=self.users[1].pk).votes_cast, 2)
+
+        # Un secondo passaggio non trova altro da fare
+        self.assertEqual(expiry.sweep(archive=True), {'expired': 0, 'archived': 0})
+
+
+class ExportTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=self.owner)
+        choice = Choice.objects.create(poll=self.poll, text='Sì, "certo"')
+        for i in range(3):
+            voter = User.objects.create_user(username=f'voter{i}', email=f'voter{i}@example.com', password='pw')
+            Vote.objects.create(user=voter, poll=self.poll, choice=choice, ip_address='10.0.0.1')
+        self.url = reverse('poll-votes-export', args=[self.poll.pk])
+        self.login(self.owner)
+
+    def login(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, body = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'poll-{self.poll.pk}-votes.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['username'] for row in rows], ['voter0', 'voter1', 'voter2'])
+        self.assertEqual(rows[0]['choice'], 'Sì, "certo"')
+
+    def test_ndjson_gzip(self):
+        response, body = self.export(format='ndjson', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['ip_address'], '10.0.0.1')
+        self.assertEqual(datetime.datetime.fromisoformat(rows[0]['voted_at']), Vote.objects.order_by('id')[0].voted_at)
+
+    def test_includes_archived_votes(self):
+        _, before = self.export(format='ndjson')
+        expiry.archive_votes([self.poll.pk])
+        self.assertFalse(Vote.objects.exists())
+        _, after = self.export(format='ndjson')
+        self.assertEqual(after, before)
+
+    async def test_async_stream_under_asgi(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.owner).access_token))()
+        response = await self.async_client.get(
+            self.url, {'format': 'ndjson'}, headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([block async for block in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 3)
+        self.assertEqual(body, await sync_to_async(lambda: b''.join(export.stream_votes(self.poll.pk, 'ndjson')))())
+
+    def test_access(self):
+        response = self.client.get(reverse('poll-votes-export', args=[999]), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', json.loads(response.content))
+        self.login(get_user_model().objects.get(username='voter0'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_management_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/votes.csv.gz'
+            call_command('export_votes', self.poll.pk, '--gzip', '--chunk-size', '2', '-o', path)
+            with gzip.open(path, 'rt') as fp:
+                self.assertEqual(len(list(csv.DictReader(fp))), 3)
+        with self.assertRaises(CommandError):
+            call_command('export_votes', 999)
+
+
+@override_settings(PERFORMANCE_METRICS={**settings.PERFORMANCE_METRICS, 'ENABLED': True, 'SLOW_REQUEST_MS': 0})
+class PerformanceMiddlewareTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        metrics.registry.reset()
+        owner = get_user_model().objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=owner)
+        Choice.objects.create(poll=self.poll, text='A')
+
+    def test_server_timing_and_metrics(self):
+        url = reverse('poll-results', args=[self.poll.pk])
+        with self.assertLogs('polling_project.slow_requests', 'WARNING') as logs:
+            response = self.client.get(url)
+            response = self.client.get(url)
+            body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('poll_result_snapshots', logs.output[0])
+        self.assertIn('db;dur=', response['Server-Timing'])
+        # Seconda lettura: servita dalla cache, nessuna query
+        self.assertIn('desc="0 queries"', response['Server-Timing'])
+        self.assertIn('hit=1', response['Server-Timing'])
+
+        self.assertIn('polling_request_duration_seconds_count{view="poll-results",method="GET"} 2', body)
+        self.assertIn('polling_cache_requests_total{view="poll-results",result="hit"} 1', body)
+
+    async def test_async_requests(self):
+        async def view(request):
+            await cache.aget('missing')
+            await Poll.objects.filter(pk=self.poll.pk).aexists()
+            return HttpResponse('ok')
+
+        # Come ASGIHandler: la catena dei middleware si costruisce fuori dall'event loop
+        middleware = await sync_to_async(PerformanceMiddleware)(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(AsyncRequestFactory().get('/'))
+        # Query eseguita nel thread di sync_to_async; aget contata una volta sola
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertIn('hit=0 miss=1', response['Server-Timing'])
+
+    def test_metrics_disabled(self):
+        with override_settings(PERFORMANCE_METRICS={'ENABLED': False}):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+@override_settings(VOTE_SCREENING={**settings.VOTE_SCREENING, 'ENABLED': True, 'FLAG_AFTER': 1, 'BLOCK_AFTER': 2})
+class VoteScreeningTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pw')
+            for i in range(4)
+        ]
+        self.poll = Poll.objects.create(title='Poll', created_by=self.users[0])
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+
+    def vote(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.post(
+            reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json',
+            REMOTE_ADDR='10.0.0.1'
+        )
+
+    def test_repeat_rejected_without_database(self):
+        self.assertEqual(self.vote(self.users[0]).status_code, 201)
+        self.assertEqual(Vote.objects.get().ip_address, '10.0.0.1')
+        # Utente già in cache di autenticazione: nessuna query per il voto ripetuto
+        with self.assertNumQueries(0):
+            self.assertEqual(self.vote(self.users[0]).status_code, 400)
+
+    def test_ip_burst_flagged_then_blocked(self):
+        self.assertEqual(self.vote(self.users[0]).status_code, 201)
+        self.assertEqual(self.vote(self.users[1]).status_code, 201)
+        flag = FlaggedVote.objects.get()
+        self.assertEqual((flag.action, flag.vote.user_id), (FlaggedVote.ACTION_ACCEPTED, self.users[1].pk))
+
+        response = self.vote(self.users[2])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.vote(self.users[3]).status_code, 429)
+        # Un solo rifiuto registrato per finestra
+        self.assertEqual(FlaggedVote.objects.filter(action=FlaggedVote.ACTION_REJECTED).count(), 1)
+        self.assertEqual(Vote.objects.count(), 2)
+
+
+class VoteTimelineTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        self.poll = Poll.objects.create(title='Poll', created_by=self.voter)
+        self.choice = Choice.objects.create(poll=self.poll, text='A')
+        self.other = Choice.objects.create(poll=self.poll, text='B')
+
+    def test_vote_updates_minute_rollup(self):
+        token = RefreshToken.for_user(self.voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.post(reverse('poll-vote', args=[self.poll.pk]), {'choice': self.choice.pk}, format='json')
+        self.client.credentials()
+
+        url = reverse('poll-timeline', args=[self.poll.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'granularity': 'minute'})
+        self.assertEqual(len(response.data['timeline']), 1)
+        self.assertEqual(response.data['timeline'][0]['choices'], {str(self.choice.pk): 1})
+        # Come le altre date dell'API: nel fuso di TIME_ZONE, non in UTC
+        bucket = timezone.localtime(VoteRollup.objects.get().bucket)
+        self.assertEqual(response.data['timeline'][0]['bucket'], bucket.isoformat())
+        self.assertEqual(self.client.get(url, {'granularity': 'week'}).status_code, 400)
+
+    def test_missing_poll(self):
+        url = reverse('poll-timeline', args=[999])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # Sondaggio senza voti: timeline vuota
+        response = self.client.get(reverse('poll-timeline', args=[self.poll.pk]))
+        self.assertEqual((response.status_code, response.data['timeline']), (200, []))
+
+    def test_compaction_merges_minutes_into_hours(self):
+        start = datetime.datetime(2025, 3, 1, 10, 0, tzinfo=datetime.timezone.utc)
+        rollups.record([
+            Vote(poll=self.poll, choice=choice, voted_at=start + datetime.timedelta(minutes=minutes))
+            for choice, minutes in ((self.choice, 1), (self.choice, 1), (self.choice, 59), (self.other, 61))
+        ])
+        self.assertEqual(VoteRollup.objects.count(), 3)
+
+        self.assertEqual(rollups.compact(), 3)
+        hours = VoteRollup.objects.filter(granularity=VoteRollup.HOUR).order_by('bucket', 'choice_id')
+        self.assertEqual([(row.bucket.hour, row.votes) for row in hours], [(10, 3), (11, 1)])
+
+        timeline = rollups.timeline(self.poll.pk, 'day', since=start, until=start + datetime.timedelta(days=1))
+        self.assertEqual(timeline, [{'bucket': start.replace(hour=0), 'total': 4, 'choices': {self.choice.pk: 3, self.other.pk: 1}}])
+
+
+class PollSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user(username='owner', email='owner@example.com', password='pw')
+        cls.city = Poll.objects.create(title='Città preferita', description='Per le vacanze', created_by=owner)
+        cls.pizza = Poll.objects.create(title='Pizza', description='La migliore città per la pizza', created_by=owner)
+        cls.lang = Poll.objects.create(title='Linguaggio', created_by=owner)
+        Choice.objects.create(poll=cls.lang, text='Python')
+        Choice.objects.create(poll=cls.lang, text='Java')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('poll-list-create'), {'q': query, **params})
+
+    def titles(self, response):
+        return [poll['title'] for poll in response.data['results']]
+
+    def test_ranked_by_title_first(self):
+        # Senza accenti e per prefisso; il titolo pesa più della descrizione
+        self.assertEqual(self.titles(self.search('citt')), ['Città preferita', 'Pizza'])
+
+    def test_choices_indexed_by_triggers(self):
+        self.assertEqual(self.titles(self.search('python')), ['Linguaggio'])
+        Choice.objects.filter(poll=self.lang, text='Python').update(text='Rust')
+        self.assertEqual(self.titles(self.search('python')), [])
+        self.assertEqual(self.titles(self.search('rust')), ['Linguaggio'])
+
+    def test_cursor_pagination(self):
+        response = self.search('citta', page_size=1)
+        self.assertEqual(self.titles(response), ['Città preferita'])
+        self.assertEqual(self.titles(self.client.get(response.data['next'])), ['Pizza'])
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(self.titles(self.search('"pizza" OR NEAR(')), [])
+        self.assertEqual(self.titles(self.search('pizza*')), ['Pizza'])
+        # Nessuna parola: lista normale
+        self.assertEqual(len(self.titles(self.search('!!'))), 3)
+
+    def test_fast_serializers(self):
+        with override_settings(POLL_FAST_SERIALIZERS=True):
+            self.assertEqual(self.titles(self.search('citta')), ['Città preferita', 'Pizza'])
+
+
+class TrendingTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        trending.tracker.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.old = Poll.objects.create(title='Old', created_by=self.owner)
+        self.fresh = Poll.objects.create(title='Fresh', created_by=self.owner)
+        self.choice = Choice.objects.create(poll=self.fresh, text='A')
+
+    def test_recent_votes_outrank_older_ones(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # 10 voti di due emivite fa valgono 2.5 voti di adesso
+        trending.tracker.record(self.old.pk, 10, when=now - datetime.timedelta(hours=12))
+        trending.tracker.record(self.fresh.pk, 3, when=now)
+        trending.tracker.flush()
+
+        self.assertEqual([poll_id for poll_id, _ in trending.tracker.top(10)], [self.fresh.pk, self.old.pk])
+        score = PollTrendingScore.objects.get(poll=self.old)
+        self.assertEqual(score.votes, 10)
+        self.assertAlmostEqual(trending.recent_votes(score.log_score, now), 2.5)
+
+        # Un altro worker riparte dal database
+        trending.tracker.clear()
+        trending.tracker.record(self.old.pk, 1, when=now)
+        trending.tracker.flush()
+        self.assertEqual(PollTrendingScore.objects.get(poll=self.old).votes, 11)
+        self.assertEqual(trending.tracker.top(1)[0][0], self.old.pk)
+
+    def test_feed_after_vote(self):
+        voter = get_user_model().objects.create_user(username='voter', email='voter@example.com', password='pw')
+        token = RefreshToken.for_user(voter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('poll-vote', args=[self.fresh.pk]), {'choice': self.choice.pk}, format='json')
+        self.client.credentials()
+
+        url = reverse('poll-trending')
+        # Top-K in memoria: una query per i sondaggi (con autore)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual([poll['title'] for poll in response.data['results']], ['Fresh'])
+        self.assertAlmostEqual(response.data['results'][0]['trending_score'], 1, places=2)
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+
+        # I sondaggi scaduti escono dal feed
+        Poll.objects.filter(pk=self.fresh.pk).update(expires_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(self.client.get(url).data['results'], [])
+
+
+class IdempotentCreateTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='owner', email='owner@example.com', password='pw')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.data = {'title': 'Pizza o pasta?', 'choices': ['Pizza', 'Pasta']}
+
+    def create(self, data=None, **headers):
+        return self.client.post(reverse('poll-list-create'), data or self.data, format='json', headers=headers)
+
+    def test_retry_replays_response(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.create(**{'Idempotency-Key': 'retry-1'})
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual([choice['text'] for choice in first.data['choices']], ['Pizza', 'Pasta'])
+
+        # Dalla cache, poi dal database: nessuna scrittura
+        with self.assertNumQueries(0):
+            retry = self.create(**{'Idempotency-Key': 'retry-1'})
+        cache.delete(idempotency.cache_key(self.user.pk, 'retry-1'))
+        with self.assertNumQueries(1):
+            self.create(**{'Idempotency-Key': 'retry-1'})
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Poll.objects.count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.polls_created, 1)
+
+        # Stessa chiave, altra richiesta
+        self.assertEqual(self.create({**self.data, 'title': 'Altro'}, **{'Idempotency-Key': 'retry-1'}).status_code, 422)
+        # Senza chiave ogni richiesta crea un sondaggio
+        self.create()
+        self.create()
+        self.assertEqual(Poll.objects.count(), 3)
+
+    def test_create_response_matches_detail(self):
+        # POST /api/polls/ risponde con il corpo del dettaglio, non con i dati inviati
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create({**self.data, 'description': 'Scegli'})
+        self.assertEqual(response.status_code, 201)
+        detail = self.client.get(reverse('poll-detail', args=[response.data['id']]))
+        self.assertEqual(response.json(), detail.json())
+        self.assertEqual(
+            set(response.data),
+            {'id', 'title', 'description', 'created_by', 'created_at', 'updated_at', 'expires_at',
+             'total_votes', 'is_active', 'is_expired', 'choices'},
+        )
+        self.assertEqual(response.data['created_by'], 'owner')
+        self.assertEqual([set(choice) for choice in response.data['choices']], [{'id', 'text', 'votes_count'}] * 2)
+
+    def test_failed_create_leaves_nothing(self):
+        response = self.create({'title': 'Una sola', 'choices': ['A']}, **{'Idempotency-Key': 'bad'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        # La chiave resta libera per la richiesta corretta
+        self.assertEqual(self.create(**{'Idempotency-Key': 'bad'}).status_code, 201)
+
+    def test_expired_key_is_reused(self):
+        self.create(**{'Idempotency-Key': 'old'})
+        IdempotencyKey.objects.update(created_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        cache.clear()
+        self.assertEqual(self.create(**{'Idempotency-Key': 'old'}).status_code, 201)
+        self.assertEqual(Poll.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+class AsyncReadViewTests(APITestCase):
+    """Le viste async restituiscono gli stessi corpi, cursori e ETag di quelle sincrone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user(username='owner', email='owner@example.com', password='pw')
+        for i in range(3):
+            poll = Poll.objects.create(title=f'Poll {i}', created_by=cls.owner)
+            Choice.objects.create(poll=poll, text='A')
+            Choice.objects.create(poll=poll, text='B')
+        snapshots.refresh(Poll.objects.values_list('pk', flat=True))
+        cls.poll = Poll.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def assertSameResponse(self, view, path, **kwargs):
+        sync_response = await sync_to_async(self.client.get)(path)
+        response = await view(self.factory.get(path), **kwargs)
+        self.assertEqual(response.status_code, sync_response.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(sync_response.content))
+        self.assertEqual(response.get('ETag'), sync_response.get('ETag'))
+        return response
+
+    async def test_list_and_cursor(self):
+        view = views.AsyncPollListView.as_view()
+        url = reverse('poll-list-create')
+        response = await self.assertSameResponse(view, f'{url}?page_size=2')
+        next_url = json.loads(response.content)['next']
+        await self.assertSameResponse(view, next_url[next_url.index(url):])
+        await self.assertSameResponse(view, f'{url}?q=poll')
+
+    async def test_detail_and_results(self):
+        detail = reverse('poll-detail', args=[self.poll.pk])
+        response = await self.assertSameResponse(views.AsyncPollDetailView.as_view(), detail, pk=self.poll.pk)
+        await self.assertSameResponse(views.AsyncPollDetailView.as_view(), reverse('poll-detail', args=[999]), pk=999)
+        await self.assertSameResponse(
+            views.apoll_results, reverse('poll-results', args=[self.poll.pk]), poll_id=self.poll.pk
+        )
+        await self.assertSameResponse(views.apoll_results, reverse('poll-results', args=[999]), poll_id=999)
+
+        # GET condizionale: 304 senza leggere il sondaggio
+        request = self.factory.get(detail, headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await views.AsyncPollDetailView.as_view()(request, pk=self.poll.pk)).status_code, 304)
+
+    async def test_writes_use_sync_view(self):
+        token = RefreshToken.for_user(self.owner).access_token
+        request = self.factory.post(
+            reverse('poll-list-create'), {'title': 'Nuovo', 'choices': ['A', 'B']},
+            content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+        )
+        response = await views.AsyncPollListView.as_view()(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Poll.objects.filter(title='Nuovo').aexists())
 
-# Create your tests here.
@@ -0,0 +1,170 @@
+"""
+Sondaggi "trending": velocità di voto con decadimento esponenziale.
+
+Ogni voto al tempo t vale exp(λ·(t - EPOCH)), con λ = ln 2 / HALF_LIFE:
+il punteggio di un sondaggio è la somma di questi pesi e, diviso per
+exp(λ·(ora - EPOCH)), dà i voti "recenti" con emivita HALF_LIFE. Il
+rapporto tra due sondaggi non cambia col tempo, quindi si confrontano
+direttamente le somme, conservate come logaritmo (log-sum-exp) per non
+andare in overflow.
+
+Ogni worker accumula i voti in ``pending`` e mantiene in memoria un
+top-K limitato; ogni FLUSH_INTERVAL secondi (al primo voto o alla prima
+lettura del feed utile) somma i pendenti in PollTrendingScore e ricarica
+il top-K globale con una lettura dell'indice su log_score. Il feed non
+aggrega mai la tabella votes.
+"""
+import datetime
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Poll, PollTrendingScore
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HALF_LIFE_HOURS': 6,
+    'TOP_K': 100,
+    'FLUSH_INTERVAL': 5.0,
+}
+
+EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def get_setting(name):
+    return getattr(settings, 'TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def decay_rate():
+    return math.log(2) / (get_setting('HALF_LIFE_HOURS') * 3600)
+
+
+def log_weight(when):
+    """Logaritmo del peso di un voto al tempo ``when``."""
+    return decay_rate() * (when - EPOCH).total_seconds()
+
+
+def logaddexp(a, b):
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def recent_votes(log_score, now=None):
+    """Voti recenti equivalenti (pesati con l'emivita) all'istante ``now``."""
+    return math.exp(log_score - log_weight(now or timezone.now()))
+
+
+class TrendingTracker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # poll_id -> [log della somma dei pesi non ancora salvati, voti]
+        self._pending = {}
+        # poll_id -> log_score stimato (top-K globale più i voti locali)
+        self._top = {}
+        self._last_flush = 0.0
+
+    def record(self, poll_id, votes=1, when=None):
+        """Aggiunge ``votes`` voti al sondaggio; salva i pendenti se è ora."""
+        weight = log_weight(when or timezone.now()) + math.log(votes)
+        with self._lock:
+            entry = self._pending.setdefault(poll_id, [-math.inf, 0])
+            entry[0] = logaddexp(entry[0], weight)
+            entry[1] += votes
+            if poll_id in self._top:
+                self._top[poll_id] = logaddexp(self._top[poll_id], weight)
+            else:
+                self._offer(poll_id, entry[0])
+        self.flush_if_due()
+
+    def _offer(self, poll_id, log_score):
+        # Top-K limitato: entra solo se supera il minimo attuale
+        if len(self._top) < get_setting('TOP_K'):
+            self._top[poll_id] = log_score
+            return
+        lowest = min(self._top, key=self._top.get)
+        if log_score > self._top[lowest]:
+            del self._top[lowest]
+            self._top[poll_id] = log_score
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= get_setting('FLUSH_INTERVAL'):
+            self.flush()
+
+    def flush(self):
+        """Somma i voti pendenti nel database e ricarica il top-K globale."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        try:
+            if pending:
+                self._persist(pending)
+            top = dict(
+                PollTrendingScore.objects.filter(poll__is_active=True)
+                .order_by('-log_score')
+                .values_list('poll_id', 'log_score')[:get_setting('TOP_K')]
+            )
+        except Exception:
+            # Chiamata anche dopo il commit di un voto: mai un errore per il client.
+            # I voti non salvati vengono riprovati al prossimo giro
+            logger.exception('Errore nel salvataggio dei punteggi trending')
+            with self._lock:
+                for poll_id, (log_score, votes) in pending.items():
+                    entry = self._pending.setdefault(poll_id, [-math.inf, 0])
+                    entry[0] = logaddexp(entry[0], log_score)
+                    entry[1] += votes
+            return
+        with self._lock:
+            # Voti arrivati durante il salvataggio
+            for poll_id, (log_score, _) in self._pending.items():
+                if poll_id in top:
+                    top[poll_id] = logaddexp(top[poll_id], log_score)
+            self._top = top
+
+    @staticmethod
+    def _persist(pending):
+        with transaction.atomic():
+            # Sondaggi cancellati o disattivati nel frattempo vengono scartati
+            live = set(Poll.objects.filter(pk__in=pending, is_active=True).values_list('pk', flat=True))
+            existing = PollTrendingScore.objects.filter(pk__in=live)
+            if connection.features.has_select_for_update:
+                existing = existing.select_for_update()
+            current = {poll_id: (log_score, votes) for poll_id, log_score, votes in
+                       existing.values_list('poll_id', 'log_score', 'votes')}
+            PollTrendingScore.objects.bulk_create(
+                [
+                    PollTrendingScore(
+                        poll_id=poll_id,
+                        log_score=logaddexp(current.get(poll_id, (-math.inf, 0))[0], log_score),
+                        votes=current.get(poll_id, (-math.inf, 0))[1] + count,
+                    )
+                    for poll_id, (log_score, count) in pending.items()
+                    if poll_id in live
+                ],
+                update_conflicts=True,
+                unique_fields=['poll'],
+                update_fields=['log_score', 'votes', 'updated_at'],
+            )
+
+    def top(self, limit):
+        """[(poll_id, log_score)] in ordine decrescente, dal top-K in memoria."""
+        self.flush_if_due()
+        with self._lock:
+            ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+
+tracker = TrendingTracker()
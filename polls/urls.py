@@ -1,22 +1,51 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .views import RegisterView, poll_results
 
+# Sotto ASGI (profilo uvicorn) le letture usano le viste async
+if settings.ASYNC_READ_VIEWS:
+    poll_list_view = views.AsyncPollListView.as_view()
+    poll_detail_view = views.AsyncPollDetailView.as_view()
+    poll_results_view = views.apoll_results
+else:
+    poll_list_view = views.PollListCreateView.as_view()
+    poll_detail_view = views.PollDetailView.as_view()
+    poll_results_view = poll_results
+
 
 urlpatterns = [
     # Elenco e creazione di sondaggi
-    path('polls/', views.PollListCreateView.as_view(), name='poll-list-create'),
+    path('polls/', poll_list_view, name='poll-list-create'),
+
+    # Sondaggi più votati di recente
+    path('polls/trending/', views.trending_polls, name='poll-trending'),
 
     # Dettaglio di un singolo sondaggio
-    path('polls/<int:pk>/', views.PollDetailView.as_view(), name='poll-detail'),
+    path('polls/<int:pk>/', poll_detail_view, name='poll-detail'),
 
     # Votazione a un sondaggio specifico
     path('polls/<int:poll_id>/vote/', views.vote_poll, name='poll-vote'),
 
+    # Storico dei voti di un sondaggio
+    path('polls/<int:poll_id>/votes/', views.PollVoteListView.as_view(), name='poll-votes'),
+
+    # Export in streaming dei voti (CSV o NDJSON)
+    path('polls/<int:poll_id>/votes/export/', views.export_votes, name='poll-votes-export'),
+
+    # Import massivo di voti
+    path('polls/votes/bulk/', views.bulk_vote, name='poll-votes-bulk'),
+
     # Registrazione utente
     path("register/", RegisterView.as_view(), name="register"),
 
     # Visualizzare i risulati
-    path('polls/<int:poll_id>/results/', poll_results, name='poll-results'),
+    path('polls/<int:poll_id>/results/', poll_results_view, name='poll-results'),
+
+    # Voti nel tempo (rollup al minuto / all'ora)
+    path('polls/<int:poll_id>/timeline/', views.poll_timeline, name='poll-timeline'),
+
+    # Risultati in tempo reale (Server-Sent Events)
+    path('polls/<int:poll_id>/results/stream/', views.poll_results_stream, name='poll-results-stream'),
 
 ]
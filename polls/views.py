@@ -1,53 +1,155 @@
-from django.contrib.auth.models import User
-from django.db import transaction
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.views import APIView
+from rest_framework.settings import api_settings
 
+from . import bulk, conditional, counters, expiry, export, idempotency, results_cache, rollups, screening, search, snapshots, trending, writebehind
 from .models import Poll, Vote
+from .pagination import PollCursorPagination, PollSearchPagination, VoteCursorPagination
 from .permissions import IsOwnerOrReadOnly
-from .serializers import PollListSerializer, PollDetailSerializer, PollCreateSerializer, VoteSerializer
-
+from .pubsub import broker
+from .ratelimit import client_ip, register_rate_limit
+from .renderers import CSVExportRenderer, NDJSONExportRenderer
+from .serializers import (
+    PollListSerializer, PollDetailSerializer, PollCreateSerializer, VoteSerializer, VoteListSerializer,
+    BulkVoteSerializer, TimelinePointSerializer, PollListFastSerializer, PollDetailFastSerializer
+)
+from .signals import vote_committed
+from users import dashboard
+
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
+from django.views import View
+
+# Pool limitato per l'hash delle password: le ondate di registrazioni
+# non occupano i thread che servono i voti
+_password_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.REGISTER_HASH_WORKERS, thread_name_prefix='password-hash'
+)
+
+
+@sync_to_async
+def _insert_user(user):
+    # Savepoint: dopo un IntegrityError la connessione resta utilizzabile
+    with transaction.atomic():
+        user.save(force_insert=True)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
-class RegisterView(APIView):
-    permission_classes = [AllowAny]
+class RegisterView(View):
+    """
+    Registrazione utente (vista async)
+    Limite per IP a token bucket; l'unicità di username ed email
+    è garantita dai vincoli del database, senza controlli preventivi.
+    Con il profilo sync di gunicorn (default del Procfile) Django la esegue
+    in un event loop per richiesta: il guadagno c'è con GUNICORN_PROFILE=uvicorn
+    """
+
+    async def post(self, request):
+        allowed, retry_after = await sync_to_async(register_rate_limit.allow)(client_ip(request))
+        if not allowed:
+            response = JsonResponse({"error": "Troppe registrazioni, riprova più tardi"}, status=429)
+            response["Retry-After"] = str(math.ceil(retry_after))
+            return response
 
-    def post(self, request):
-        import json
-        data = json.loads(request.body)
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "JSON non valido"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "JSON non valido"}, status=400)
 
         username = data.get("username")
         password = data.get("password")
+        email = data.get("email") or None
 
-        if not username or not password:
+        if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
             return JsonResponse({"error": "Username e password obbligatori"}, status=400)
+        if email is not None and not isinstance(email, str):
+            return JsonResponse({"error": "Email non valida"}, status=400)
+
+        # full_clean normalizza username ed email (come create_user) e applica
+        # i validatori dei campi; l'unicità la decide il database all'insert
+        User = get_user_model()
+        user = User(username=username, email=email)
+        try:
+            user.full_clean(exclude=['password'], validate_unique=False, validate_constraints=False)
+        except ValidationError as exc:
+            return JsonResponse({"error": "Dati non validi", "fields": exc.message_dict}, status=400)
+        # clean() trasforma None in "": senza email resta NULL (unique)
+        user.email = user.email or None
+
+        loop = asyncio.get_running_loop()
+        user.password = await loop.run_in_executor(_password_hash_pool, make_password, password)
+
+        try:
+            await _insert_user(user)
+        except IntegrityError:
+            if await User.objects.filter(username=user.username).aexists():
+                return JsonResponse({"error": "Username già registrato"}, status=400)
+            return JsonResponse({"error": "Email già registrata"}, status=400)
 
-        if User.objects.filter(username=username).exists():
-            return JsonResponse({"error": "Username già registrato"}, status=400)
-
-        User.objects.create_user(username=username, password=password)
         return JsonResponse({"message": "Registrazione completata"}, status=201)
 
 
-
 class PollListCreateView(generics.ListCreateAPIView):
     """
     CLASS-BASED GENERIC VIEW (Requisito del progetto)
-    GET: Lista tutti i sondaggi (anche per anonimi)
-    POST: Crea nuovo sondaggio (solo autenticati)
+    GET: Lista tutti i sondaggi (anche per anonimi), ?q= per la ricerca full-text
+    POST: Crea nuovo sondaggio (solo autenticati); risponde con lo stesso
+    corpo del dettaglio (id e scelte con i loro id), non con i dati inviati
     """
-    queryset = Poll.objects.filter(is_active=True)
+    # select_related evita una query per created_by su ogni riga
+    queryset = Poll.objects.filter(is_active=True).select_related('created_by')
+    pagination_class = PollCursorPagination
+
+    @property
+    def search_query(self):
+        query = self.request.query_params.get('q') if self.request.method == 'GET' else None
+        return query if search.terms(query) else None
+
+    @property
+    def paginator(self):
+        # Con ?q= i risultati sono ordinati per pertinenza
+        if not hasattr(self, '_paginator'):
+            self._paginator = PollSearchPagination() if self.search_query else self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        # Esclude anche i sondaggi scaduti non ancora disattivati dallo sweeper
+        queryset = super().get_queryset().filter(expiry.not_expired())
+        extra = ()
+        if self.search_query:
+            queryset = search.search_polls(queryset, self.search_query)
+            extra = ('rank',)
+        if self.request.method == 'GET' and settings.POLL_FAST_SERIALIZERS:
+            return queryset.values(*PollListFastSerializer.values_fields, *extra)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return PollCreateSerializer
+        if settings.POLL_FAST_SERIALIZERS:
+            return PollListFastSerializer
         return PollListSerializer
 
     def get_permissions(self):
@@ -55,19 +157,103 @@ class PollListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        # ETag dalla pagina già letta: con un 304 si salta la serializzazione
+        etag, last_modified = conditional.page_validators(request, page)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return conditional.set_validators(response, etag, last_modified)
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Invalid {idempotency.HEADER}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Nuovo tentativo del client: stessa risposta, nessuna scrittura
+        fingerprint = idempotency.fingerprint(request.data)
+        stored = idempotency.lookup(request.user, key)
+        if stored is not None:
+            return idempotency.replay(stored, fingerprint)
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                idempotency.save(request.user, key, fingerprint, response)
+        except IntegrityError:
+            # Stessa chiave in una richiesta concorrente: vale il suo sondaggio
+            stored = idempotency.lookup(request.user, key)
+            if stored is None:
+                raise
+            return idempotency.replay(stored, fingerprint)
+        return response
+
     def perform_create(self, serializer):
-        # Assegna automaticamente il creatore
-        poll = serializer.save(created_by=self.request.user)
-        # Aggiorna statistiche user
-        self.request.user.polls_created += 1
-        self.request.user.save()
+        # Sondaggio, scelte e statistiche dell'autore in una sola transazione
+        with transaction.atomic():
+            poll = serializer.save(created_by=self.request.user)
+            # F(): nessuna lettura né riscrittura dell'intera riga utente
+            get_user_model().objects.filter(pk=self.request.user.pk).update(
+                polls_created=F('polls_created') + 1
+            )
+            dashboard.record_poll(poll)
 
 
 class PollDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Poll.objects.filter(is_active=True)
+    # Le scelte con i voti arrivano dallo snapshot: una sola query
+    queryset = Poll.objects.filter(is_active=True).select_related('created_by', 'results_snapshot')
     serializer_class = PollDetailSerializer
     permission_classes = [IsOwnerOrReadOnly]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET' and settings.POLL_FAST_SERIALIZERS:
+            return PollDetailFastSerializer.values(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and settings.POLL_FAST_SERIALIZERS:
+            return PollDetailFastSerializer
+        return PollDetailSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        # Validatori da una sola riga, senza caricare sondaggio e snapshot
+        etag, last_modified = conditional.poll_validators(kwargs['pk'])
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        return conditional.set_validators(response, etag, last_modified)
+
+
+def _get_owned_poll(request, poll_id):
+    """Sondaggio accessibile solo al creatore o allo staff (dati dei votanti)"""
+    poll = get_object_or_404(Poll.objects.only('id', 'created_by_id'), pk=poll_id)
+    if poll.created_by_id != request.user.id and not request.user.is_staff:
+        raise PermissionDenied()
+    return poll
+
+
+class PollVoteListView(generics.ListAPIView):
+    """
+    Storico dei voti di un sondaggio (paginazione a cursore)
+    Solo il creatore del sondaggio o lo staff
+    Solo la tabella votes: i voti archiviati dallo sweeper restano nell'export
+    """
+    serializer_class = VoteListSerializer
+    pagination_class = VoteCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        poll = _get_owned_poll(self.request, self.kwargs['poll_id'])
+        return Vote.objects.filter(poll_id=poll.id).select_related('user')
+
 
 
 @api_view(['POST'])
@@ -77,6 +263,26 @@ def vote_poll(request, poll_id):
     Vota in un sondaggio
     Solo utenti autenticati
     """
+    # Screening in memoria: voti ripetuti e raffiche dallo stesso IP
+    ip_address = client_ip(request)
+    verdict = screening.Verdict()
+    if screening.get_setting('ENABLED'):
+        verdict = screening.screen.screen(poll_id, request.user.id, ip_address)
+        if verdict.duplicate:
+            return Response(
+                {'error': 'You have already voted in this poll'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if verdict.blocked:
+            # Primo rifiuto della finestra (il sondaggio potrebbe non esistere)
+            if verdict.record_block and Poll.objects.filter(pk=poll_id).exists():
+                screening.flag(poll_id, request.user.id, ip_address, verdict)
+            return Response(
+                {'error': 'Too many votes from this address, retry later'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(math.ceil(verdict.retry_after))}
+            )
+
     poll = get_object_or_404(Poll, id=poll_id, is_active=True)
 
     if poll.is_expired:
@@ -87,28 +293,40 @@ def vote_poll(request, poll_id):
 
     # Controlla se ha già votato
     if Vote.objects.filter(user=request.user, poll=poll).exists():
+        screening.screen.remember(poll.id, request.user.id)
         return Response(
             {'error': 'You have already voted in this poll'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    serializer = VoteSerializer(data=request.data, context={'request': request})
+    serializer = VoteSerializer(data=request.data, context={'request': request, 'poll': poll})
     if serializer.is_valid():
-        with transaction.atomic():
-            vote = serializer.save()
-
-            # Aggiorna contatori
-            choice = vote.choice
-            choice.votes_count += 1
-            choice.save()
-
-            poll.total_votes += 1
-            poll.save()
-
-            # Aggiorna statistiche user
-            request.user.votes_cast += 1
-            request.user.save()
-
+        if writebehind.enabled():
+            response = _enqueue_vote(request, poll, serializer.validated_data['choice'], ip_address)
+            if verdict.flagged and response.status_code == status.HTTP_202_ACCEPTED:
+                screening.flag(poll.id, request.user.id, ip_address, verdict)
+            return response
+
+        try:
+            with transaction.atomic():
+                vote = serializer.save(poll=poll, ip_address=ip_address)
+                if verdict.flagged:
+                    screening.flag(poll.id, request.user.id, ip_address, verdict, vote=vote)
+                # Aggiorna contatori (F() nel database, nessun read-modify-write)
+                counters.record_vote(vote)
+                rollups.record([vote])
+                dashboard.record_votes([vote])
+                snapshots.refresh([poll.id])
+                # Cache dei risultati e client in streaming aggiornati dopo il commit
+                transaction.on_commit(lambda: vote_committed.send(sender=Vote, poll_id=poll.id))
+        except IntegrityError:
+            # Due richieste concorrenti: il vincolo unique (user, poll) decide
+            return Response(
+                {'error': 'You have already voted in this poll'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        screening.screen.remember(poll.id, request.user.id)
         return Response(
             {'message': 'Vote recorded successfully'},
             status=status.HTTP_201_CREATED
@@ -117,6 +335,71 @@ def vote_poll(request, poll_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([CSVExportRenderer, NDJSONExportRenderer])
+def export_votes(request, poll_id):
+    """
+    Export in streaming dei voti: ?format=csv|ndjson, &gzip=1 per comprimere
+    Solo il creatore del sondaggio o lo staff; comprende i voti archiviati
+    """
+    poll = _get_owned_poll(request, poll_id)
+    fmt = request.accepted_renderer.format
+    compress = request.query_params.get('gzip') in ('1', 'true')
+
+    filename = f"poll-{poll.id}-votes.{fmt}"
+    content_type = export.FORMATS[fmt]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    # Sotto ASGI un iteratore async: il generatore sincrono verrebbe letto tutto in memoria
+    stream = export.astream_votes if isinstance(request._request, ASGIRequest) else export.stream_votes
+    response = StreamingHttpResponse(stream(poll.id, fmt, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _enqueue_vote(request, poll, choice, ip_address):
+    """Modalità write-behind: il voto viene accodato e registrato in background"""
+    try:
+        queued = writebehind.enqueue(request.user.id, poll.id, choice.id, ip_address)
+    except writebehind.QueueFull:
+        return Response(
+            {'error': 'Too many pending votes, retry later'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
+        )
+    # Nell'LRU dello screening solo dopo la registrazione (polls.bulk)
+    if not queued:
+        return Response(
+            {'error': 'You have already voted in this poll'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(
+        {'message': 'Vote accepted'},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_vote(request):
+    """
+    Import massivo di voti (chioschi e raccolta offline)
+    Solo staff: riceve una lista di {user, poll, choice}
+    """
+    serializer = BulkVoteSerializer(
+        data=request.data, many=True, allow_empty=False,
+        max_length=settings.BULK_VOTES_MAX_ITEMS
+    )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = bulk.ingest_votes(serializer.validated_data)
+    return Response(summary, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def poll_results(request, poll_id):
@@ -124,22 +407,213 @@ def poll_results(request, poll_id):
     Risultati di un sondaggio
     Accessibile a tutti (anonimi + autenticati)
     """
-    poll = get_object_or_404(Poll, id=poll_id, is_active=True)
+    # Servito dalla cache; il database viene letto solo in caso di miss
+    entry = results_cache.get_entry(poll_id)
+    response = conditional.not_modified(request, entry['etag'], entry['last_modified'])
+    if response is None:
+        response = conditional.set_validators(Response(entry['data']), entry['etag'], entry['last_modified'])
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def trending_polls(request):
+    """
+    Sondaggi più votati di recente (voti con decadimento esponenziale), ?limit=
+    Dal top-K in memoria del worker: nessuna aggregazione sulla tabella dei voti
+    """
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), trending.get_setting('TOP_K')))
+    except ValueError:
+        return Response(
+            {'error': 'Invalid limit'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    results = []
-    for choice in poll.choices.all():
-        percentage = 0
-        if poll.total_votes > 0:
-            percentage = round((choice.votes_count / poll.total_votes) * 100, 1)
+    ranked = trending.tracker.top(limit)
+    polls = (
+        Poll.objects.filter(is_active=True).filter(expiry.not_expired())
+        .select_related('created_by').in_bulk([poll_id for poll_id, _ in ranked])
+    )
+    ranked = [(polls[poll_id], log_score) for poll_id, log_score in ranked if poll_id in polls]
+    results = PollListSerializer([poll for poll, _ in ranked], many=True).data
+    now = timezone.now()
+    for item, (_, log_score) in zip(results, ranked):
+        item['trending_score'] = round(trending.recent_votes(log_score, now), 3)
+    return Response({'results': results})
 
-        results.append({
-            'choice': choice.text,
-            'votes': choice.votes_count,
-            'percentage': percentage
-        })
+
+def _parse_bound(value):
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def poll_timeline(request, poll_id):
+    """
+    Voti nel tempo per scelta: ?granularity=minute|hour|day, &since=, &until= (ISO 8601)
+    Servito interamente dai rollup (una scansione dell'indice)
+    """
+    granularity = request.query_params.get('granularity', 'hour')
+    if granularity not in rollups.GRANULARITIES:
+        return Response(
+            {'error': f"Invalid granularity, use one of: {', '.join(rollups.GRANULARITIES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        since = _parse_bound(request.query_params.get('since'))
+        until = _parse_bound(request.query_params.get('until'))
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date, use ISO 8601'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    timeline = rollups.timeline(poll_id, granularity, since, until)
+    # Nessun intervallo: 404 come poll_results se il sondaggio non esiste
+    if not timeline and not Poll.objects.filter(pk=poll_id).exists():
+        raise Http404
 
     return Response({
-        'poll': poll.title,
-        'total_votes': poll.total_votes,
-        'results': results
-    })
\ No newline at end of file
+        'poll': poll_id,
+        'granularity': granularity,
+        'timeline': TimelinePointSerializer(timeline, many=True).data,
+    })
+
+
+def _sse_event(data):
+    return f"event: results\ndata: {json.dumps(data)}\n\n"
+
+
+async def poll_results_stream(request, poll_id):
+    """
+    Risultati in tempo reale via Server-Sent Events (solo sotto ASGI)
+    Invia lo stato attuale e poi un evento per ogni voto confermato
+    """
+    # Sotto WSGI lo stream infinito occuperebbe un worker fino al timeout:
+    # 501 e il client passa alla lettura periodica di /results/
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Results streaming requires an ASGI server, poll the results endpoint instead'},
+            status=501
+        )
+    queue = broker.subscribe(poll_id)
+    try:
+        initial = await sync_to_async(results_cache.get_results)(poll_id)
+    except Exception:
+        broker.unsubscribe(poll_id, queue)
+        raise
+
+    keepalive = getattr(settings, 'POLL_STREAM_KEEPALIVE', 15)
+
+    async def events():
+        try:
+            yield _sse_event(initial)
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Commento SSE: mantiene aperta la connessione attraverso i proxy
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_event(data)
+        finally:
+            broker.unsubscribe(poll_id, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- Viste di lettura async (ASYNC_READ_VIEWS, profilo uvicorn) ---
+#
+# Stesse risposte del fast path sincrono (serializer su .values(), ETag,
+# cursori), ma con l'ORM async: sotto ASGI una richiesta in attesa del
+# database o di un client lento non occupa un thread. Le scritture passano
+# alla vista DRF sincrona.
+
+def _json_response(data, status=200):
+    # Primo renderer di DRF (JSONRenderer o FastJSONRenderer): stesso corpo delle viste sincrone
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+class _AsyncReadView(View):
+    """GET async; gli altri metodi vanno alla vista DRF sincrona ``sync_view``"""
+    sync_view = None
+
+    async def _delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = _delegate
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncPollListView(_AsyncReadView):
+    """Lista dei sondaggi (e ricerca con ?q=) con l'ORM async"""
+    sync_view = staticmethod(PollListCreateView.as_view())
+
+    async def get(self, request):
+        drf_request = Request(request)
+        query = request.GET.get('q')
+        queryset = Poll.objects.filter(is_active=True).filter(expiry.not_expired())
+        extra = ()
+        if search.terms(query):
+            queryset = search.search_polls(queryset, query)
+            extra = ('rank',)
+            paginator = PollSearchPagination()
+        else:
+            paginator = PollCursorPagination()
+
+        page = await paginator.apaginate_queryset(
+            queryset.values(*PollListFastSerializer.values_fields, *extra), drf_request
+        )
+        etag, last_modified = conditional.page_validators(request, page)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        data = paginator.get_paginated_data(PollListFastSerializer(page, many=True).data)
+        return conditional.set_validators(_json_response(data), etag, last_modified)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncPollDetailView(_AsyncReadView):
+    """Dettaglio di un sondaggio con l'ORM async"""
+    sync_view = staticmethod(PollDetailView.as_view())
+
+    async def get(self, request, pk):
+        etag, last_modified = await conditional.apoll_validators(pk)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        row = await PollDetailFastSerializer.values(Poll.objects.filter(pk=pk, is_active=True)).afirst()
+        if row is None:
+            return _json_response({'detail': 'No Poll matches the given query.'}, status=404)
+        if row['results_snapshot__results'] is None:
+            # Snapshot mancante: il serializer lo ricalcola (query sincrone)
+            data = await sync_to_async(lambda: PollDetailFastSerializer(row).data)()
+        else:
+            data = PollDetailFastSerializer(row).data
+        return conditional.set_validators(_json_response(data), etag, last_modified)
+
+
+async def apoll_results(request, poll_id):
+    """Risultati di un sondaggio (vista async, come poll_results)"""
+    if request.method not in ('GET', 'HEAD'):
+        return _json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        entry = await results_cache.aget_entry(poll_id)
+    except Http404:
+        return _json_response({'detail': 'Not found.'}, status=404)
+    response = conditional.not_modified(request, entry['etag'], entry['last_modified'])
+    if response is None:
+        response = conditional.set_validators(_json_response(entry['data']), entry['etag'], entry['last_modified'])
+    return response
+
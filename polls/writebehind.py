@@ -0,0 +1,197 @@
+"""
+Coda write-behind per i voti (modalità opzionale per sondaggi "flash").
+
+vote_poll valida il voto e lo accoda in un journal SQLite separato
+(in modalità WAL), poi risponde subito 202. Un thread in background, o
+il comando ``flush_vote_journal``, svuota il journal a blocchi con
+polls.bulk.ingest_votes. L'unicità (user, poll) è garantita sia dal
+journal sia dal vincolo sulla tabella votes, quindi un blocco
+riapplicato dopo un crash non produce voti né contatori doppi.
+
+Ogni voto viene registrato con l'ora in cui è stato accodato, non con
+quella dello svuotamento.
+"""
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'JOURNAL_PATH': 'vote_journal.sqlite3',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_PENDING': 10000,
+    'AUTO_FLUSH': True,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_votes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    poll_id INTEGER NOT NULL,
+    choice_id INTEGER NOT NULL,
+    ip_address TEXT,
+    enqueued_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, poll_id)
+);
+-- Voti in coda, aggiornati dai trigger nella stessa transazione di ogni
+-- insert o delete (gli INSERT OR IGNORE scartati non li attivano)
+CREATE TABLE IF NOT EXISTS journal_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pending INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO journal_state (id, pending) VALUES (1, (SELECT COUNT(*) FROM pending_votes));
+CREATE TRIGGER IF NOT EXISTS pending_votes_insert AFTER INSERT ON pending_votes
+BEGIN
+    UPDATE journal_state SET pending = pending + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS pending_votes_delete AFTER DELETE ON pending_votes
+BEGIN
+    UPDATE journal_state SET pending = pending - 1 WHERE id = 1;
+END;
+"""
+
+
+class QueueFull(Exception):
+    """Il journal ha raggiunto MAX_PENDING voti in attesa."""
+
+
+def get_setting(name):
+    return getattr(settings, 'VOTE_WRITE_BEHIND', {}).get(name, DEFAULTS[name])
+
+
+def enabled():
+    return get_setting('ENABLED')
+
+
+_local = threading.local()
+
+
+def _connection():
+    # Una connessione per thread e per percorso (il journal può cambiare nei test)
+    path = str(get_setting('JOURNAL_PATH'))
+    conns = _local.__dict__.setdefault('conns', {})
+    if path not in conns:
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conns[path]
+
+
+def pending_count():
+    return _connection().execute('SELECT COUNT(*) FROM pending_votes').fetchone()[0]
+
+
+def _pending():
+    """Voti in coda dal contatore dei trigger: una riga, senza scandire la tabella."""
+    return _connection().execute('SELECT pending FROM journal_state WHERE id = 1').fetchone()[0]
+
+
+def _parse_enqueued_at(value):
+    # Righe con il default CURRENT_TIMESTAMP: UTC senza fuso
+    enqueued_at = datetime.datetime.fromisoformat(value)
+    if enqueued_at.tzinfo is None:
+        enqueued_at = enqueued_at.replace(tzinfo=datetime.timezone.utc)
+    return enqueued_at
+
+
+def enqueue(user_id, poll_id, choice_id, ip_address=None):
+    """
+    Accoda un voto. Restituisce False se lo stesso utente ha già un voto
+    in coda per il sondaggio; solleva QueueFull se la coda è piena.
+    """
+    if _pending() >= get_setting('MAX_PENDING'):
+        raise QueueFull()
+    cursor = _connection().execute(
+        'INSERT OR IGNORE INTO pending_votes (user_id, poll_id, choice_id, ip_address, enqueued_at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (user_id, poll_id, choice_id, ip_address, timezone.now().isoformat()),
+    )
+    if get_setting('AUTO_FLUSH'):
+        _worker.start()
+    return cursor.rowcount == 1
+
+
+def flush(batch_size=None):
+    """
+    Svuota il journal a blocchi nella tabella votes.
+    Un solo processo alla volta; restituisce i voti creati.
+
+    Il lock è una transazione BEGIN IMMEDIATE su un file SQLite a parte
+    (portabile, e rilasciato dal sistema se il processo muore): il journal
+    resta libero per gli insert di enqueue.
+    """
+    from .bulk import ingest_votes
+
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    conn = _connection()
+    created = 0
+    lock = sqlite3.connect(f"{get_setting('JOURNAL_PATH')}.lock", timeout=0, isolation_level=None)
+    try:
+        try:
+            lock.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            # Un altro worker sta già svuotando la coda
+            return 0
+        while True:
+            rows = conn.execute(
+                'SELECT id, user_id, poll_id, choice_id, ip_address, enqueued_at '
+                'FROM pending_votes ORDER BY id LIMIT ?',
+                (batch_size,),
+            ).fetchall()
+            if not rows:
+                break
+            summary = ingest_votes([
+                {
+                    'user': user_id, 'poll': poll_id, 'choice': choice_id, 'ip_address': ip_address,
+                    'voted_at': _parse_enqueued_at(enqueued_at),
+                }
+                for _, user_id, poll_id, choice_id, ip_address, enqueued_at in rows
+            ])
+            for error in summary['errors']:
+                logger.warning('Voto in coda scartato: %s (%s)', rows[error['index']][1:4], error['error'])
+            # Rimossi solo dopo il commit dei voti: in caso di crash il blocco viene riapplicato
+            conn.executemany('DELETE FROM pending_votes WHERE id = ?', [(row[0],) for row in rows])
+            created += summary['created']
+    finally:
+        lock.close()
+    return created
+
+
+class _FlushWorker:
+    """Thread daemon che svuota il journal ogni FLUSH_INTERVAL secondi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='vote-write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(get_setting('FLUSH_INTERVAL'))
+            try:
+                flush()
+            except Exception:
+                logger.exception('Errore durante lo svuotamento della coda voti')
+            finally:
+                close_old_connections()
+
+
+_worker = _FlushWorker()
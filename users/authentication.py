@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Colonne caricate per l'utente autenticato (niente bio, avatar, ecc.)
+AUTH_USER_FIELDS = ('id', 'username', 'password', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def auth_cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def invalidate_user(user_id):
+    auth_cache().delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Come JWTAuthentication, ma l'utente viene letto da una cache a breve TTL
+    (per ID utente) caricando solo AUTH_USER_FIELDS.
+
+    Ogni token porta la versione della password (claim di revoca di
+    SimpleJWT): se la password cambia il token non è più accettato, anche
+    con l'utente ancora in cache. La voce in cache viene invalidata al
+    salvataggio dell'utente (cambio password, disattivazione) solo nella
+    cache AUTH_USER_CACHE_ALIAS: se è per processo, negli altri worker la
+    revoca ha effetto entro AUTH_USER_CACHE_TTL secondi.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = auth_cache()
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            try:
+                user = self.user_model.objects.only(*AUTH_USER_FIELDS).get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            entry = (user, get_md5_hash_password(user.password))
+            cache.set(key, entry, getattr(settings, 'AUTH_USER_CACHE_TTL', 30))
+        user, token_version = entry
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != token_version:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,257 @@
+"""
+Dashboard degli utenti (``GET /api/users/me/dashboard/``).
+
+Il riepilogo di ogni utente (UserDashboard) viene aggiornato in modo
+incrementale nella stessa transazione dei voti e dei nuovi sondaggi: voti
+ricevuti con F(), ultimi voti e ultimi sondaggi come liste limitate. La
+dashboard legge il riepilogo insieme ai contatori dell'utente (una query,
+poi dalla cache fino alla prossima modifica) e i totali correnti dei
+sondaggi elencati (una query per chiave primaria), qualunque sia la
+lunghezza dello storico.
+
+Gli utenti senza riepilogo (precedenti alla tabella) vengono ricostruiti
+al primo accesso o con ``rebuild_user_dashboards``.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from polls.models import ArchivedVote, Choice, Poll, Vote
+from .models import UserDashboard
+
+DEFAULTS = {
+    'RECENT_POLLS': 20,
+    'RECENT_VOTES': 10,
+    'CACHE_TTL': 300,
+}
+
+CACHE_KEY = 'users:dashboard:{}'
+
+_datetime = serializers.DateTimeField()
+
+SUMMARY_FIELDS = (
+    'username', 'polls_created', 'votes_cast',
+    'dashboard__votes_received', 'dashboard__recent_polls', 'dashboard__recent_votes',
+)
+POLL_FIELDS = ('id', 'title', 'created_at', 'expires_at', 'is_active', 'total_votes')
+
+
+def get_setting(name):
+    return getattr(settings, 'USER_DASHBOARD', {}).get(name, DEFAULTS[name])
+
+
+def invalidate(user_ids):
+    cache.delete_many([CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+def _invalidate_after_commit(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate(user_ids))
+
+
+def _format_datetime(value):
+    # Salvato in UTC (datetime o stringa ISO 8601): in risposta nel fuso di
+    # TIME_ZONE, come le altre date dell'API
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return _datetime.to_representation(value)
+
+
+def _locked(queryset):
+    # Riepiloghi letti e riscritti nella transazione: su PostgreSQL con lock di riga
+    if connection.features.has_select_for_update:
+        return queryset.select_for_update()
+    return queryset
+
+
+def _vote_entry(vote, choice):
+    return {
+        'poll': vote.poll_id,
+        'poll_title': choice['poll__title'],
+        'choice': vote.choice_id,
+        'choice_text': choice['text'],
+        'voted_at': vote.voted_at.isoformat(),
+    }
+
+
+def rebuild(user_id):
+    """
+    Ricalcola da zero il riepilogo di un utente (query sullo storico).
+    Gli ultimi voti comprendono quelli archiviati dallo sweeper.
+    """
+    polls = Poll.objects.filter(created_by_id=user_id)
+    limit = get_setting('RECENT_VOTES')
+    votes = sorted(
+        (
+            row
+            for model in (Vote, ArchivedVote)
+            for row in model.objects.filter(user_id=user_id)
+            .order_by('-voted_at', '-id')
+            .values('id', 'poll_id', 'choice_id', 'poll__title', 'choice__text', 'voted_at')[:limit]
+        ),
+        key=lambda row: (row['voted_at'], row['id']),
+        reverse=True,
+    )[:limit]
+    UserDashboard.objects.bulk_create(
+        [UserDashboard(
+            user_id=user_id,
+            votes_received=polls.aggregate(n=Sum('total_votes'))['n'] or 0,
+            recent_polls=list(
+                polls.order_by('-created_at', '-id').values_list('pk', flat=True)[:get_setting('RECENT_POLLS')]
+            ),
+            recent_votes=[
+                {
+                    'poll': row['poll_id'],
+                    'poll_title': row['poll__title'],
+                    'choice': row['choice_id'],
+                    'choice_text': row['choice__text'],
+                    'voted_at': row['voted_at'].isoformat(),
+                }
+                for row in votes
+            ],
+        )],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['votes_received', 'recent_polls', 'recent_votes', 'updated_at'],
+    )
+    _invalidate_after_commit([user_id])
+
+
+def record_votes(votes):
+    """
+    Aggiorna i riepiloghi di chi ha votato (ultimi voti) e dei creatori dei
+    sondaggi (voti ricevuti). Va chiamata nella transazione che crea i voti.
+    """
+    if not votes:
+        return
+    # Scelta e sondaggio già caricati (vote_poll) oppure una query per tutti (import massivo)
+    choices = {}
+    for vote in votes:
+        if Vote.choice.is_cached(vote) and Vote.poll.is_cached(vote):
+            choices[vote.choice_id] = {
+                'text': vote.choice.text,
+                'poll__title': vote.poll.title,
+                'poll__created_by_id': vote.poll.created_by_id,
+            }
+    missing = {vote.choice_id for vote in votes} - choices.keys()
+    if missing:
+        choices.update(
+            (row.pop('pk'), row) for row in
+            Choice.objects.filter(pk__in=missing).values('pk', 'text', 'poll__title', 'poll__created_by_id')
+        )
+
+    entries = defaultdict(list)
+    for vote in votes:
+        entries[vote.user_id].append(_vote_entry(vote, choices[vote.choice_id]))
+
+    owners = Counter(choices[vote.choice_id]['poll__created_by_id'] for vote in votes)
+    # Tutti i riepiloghi coinvolti bloccati insieme e in ordine di chiave
+    # prima di ogni scrittura: su PostgreSQL due transazioni con votanti e
+    # creatori incrociati non possono attendersi a vicenda
+    current = dict(
+        _locked(UserDashboard.objects.filter(pk__in=entries.keys() | owners.keys()).order_by('pk'))
+        .values_list('user_id', 'recent_votes')
+    )
+
+    # Voti ricevuti: un UPDATE con F() per ogni numero di voti distinto.
+    # Prima delle ricostruzioni, che leggono già i totali aggiornati
+    by_count = defaultdict(list)
+    for owner_id, count in owners.items():
+        by_count[count].append(owner_id)
+    for count, owner_ids in by_count.items():
+        UserDashboard.objects.filter(pk__in=owner_ids).update(
+            votes_received=F('votes_received') + count, updated_at=timezone.now()
+        )
+
+    limit = get_setting('RECENT_VOTES')
+    for user_id in entries.keys() - current.keys():
+        rebuild(user_id)
+    voters = entries.keys() & current.keys()
+    if voters:
+        UserDashboard.objects.bulk_create(
+            [
+                UserDashboard(
+                    user_id=user_id,
+                    recent_votes=(
+                        sorted(entries[user_id], key=lambda entry: entry['voted_at'], reverse=True)
+                        + current[user_id]
+                    )[:limit],
+                )
+                for user_id in sorted(voters)
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['recent_votes', 'updated_at'],
+        )
+
+    _invalidate_after_commit(entries.keys() | owners.keys())
+
+
+def record_poll(poll):
+    """Aggiunge un nuovo sondaggio al riepilogo del creatore (nella transazione che lo crea)."""
+    recent = (
+        _locked(UserDashboard.objects.filter(pk=poll.created_by_id))
+        .values_list('recent_polls', flat=True).first()
+    )
+    if recent is None:
+        rebuild(poll.created_by_id)
+        return
+    UserDashboard.objects.filter(pk=poll.created_by_id).update(
+        recent_polls=[poll.pk, *recent][:get_setting('RECENT_POLLS')], updated_at=timezone.now()
+    )
+    _invalidate_after_commit([poll.created_by_id])
+
+
+def _summary(user_id):
+    row = get_user_model().objects.filter(pk=user_id).values(*SUMMARY_FIELDS).first()
+    if row is not None and row['dashboard__recent_polls'] is None:
+        with transaction.atomic():
+            rebuild(user_id)
+        row = get_user_model().objects.filter(pk=user_id).values(*SUMMARY_FIELDS).first()
+    return row
+
+
+def get_dashboard(user_id):
+    """
+    Dashboard dell'utente: riepilogo dalla cache (o una query) più i
+    totali correnti degli ultimi sondaggi (una query).
+    """
+    key = CACHE_KEY.format(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = _summary(user_id)
+        if summary is None:
+            return None
+        cache.set(key, summary, get_setting('CACHE_TTL'))
+
+    poll_ids = summary['dashboard__recent_polls']
+    polls = {row['id']: row for row in Poll.objects.filter(pk__in=poll_ids).order_by().values(*POLL_FIELDS)} if poll_ids else {}
+    now = timezone.now()
+    return {
+        'username': summary['username'],
+        'stats': {
+            'polls_created': summary['polls_created'],
+            'votes_cast': summary['votes_cast'],
+            'votes_received': summary['dashboard__votes_received'],
+        },
+        'polls': [
+            {
+                **polls[poll_id],
+                'created_at': _format_datetime(polls[poll_id]['created_at']),
+                'expires_at': _format_datetime(polls[poll_id]['expires_at']),
+                'is_expired': polls[poll_id]['expires_at'] is not None and now > polls[poll_id]['expires_at'],
+            }
+            for poll_id in poll_ids if poll_id in polls
+        ],
+        'recent_votes': [
+            {**entry, 'voted_at': _format_datetime(entry['voted_at'])}
+            for entry in summary['dashboard__recent_votes'][:get_setting('RECENT_VOTES')]
+        ],
+    }
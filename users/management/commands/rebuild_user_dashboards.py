@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users import dashboard
+
+
+class Command(BaseCommand):
+    help = "Ricostruisce i riepiloghi delle dashboard degli utenti (UserDashboard) dallo storico"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help="ID dell'utente da ricalcolare (ripetibile). Default: tutti",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+        for user_id in user_ids:
+            with transaction.atomic():
+                dashboard.rebuild(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Dashboard ricostruite: {len(user_ids)}"))
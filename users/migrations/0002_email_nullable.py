@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+def empty_email_to_null(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    CustomUser.objects.filter(email='').update(email=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, unique=True),
+        ),
+        migrations.RunPython(empty_email_to_null, migrations.RunPython.noop),
+    ]
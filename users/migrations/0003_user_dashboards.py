@@ -0,0 +1,29 @@
+# Generated by Django 5.2.2 on 2026-10-18 12:05
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_email_nullable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDashboard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('votes_received', models.IntegerField(default=0)),
+                ('recent_polls', models.JSONField(default=list)),
+                ('recent_votes', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_dashboards',
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
@@ -6,7 +7,8 @@ class CustomUser(AbstractUser):
     """
     User personalizzato esteso - Requisito del progetto
     """
-    email = models.EmailField(unique=True)
+    # NULL se non indicata: più utenti possono registrarsi senza email
+    email = models.EmailField(unique=True, null=True, blank=True)
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=100, blank=True)
     birth_date = models.DateField(null=True, blank=True)
@@ -22,4 +24,32 @@ class CustomUser(AbstractUser):
         return self.username
 
     class Meta:
-        db_table = 'custom_user'
\ No newline at end of file
+        db_table = 'custom_user'
+
+
+class UserDashboard(models.Model):
+    """
+    Riepilogo precalcolato della dashboard di un utente (users.dashboard)
+    RELAZIONE: User -> UserDashboard (OneToOne)
+    Aggiornato a ogni voto e a ogni nuovo sondaggio: la dashboard non
+    legge mai lo storico completo dei voti o dei sondaggi
+    """
+    user = models.OneToOneField(
+        'CustomUser',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='dashboard'
+    )
+    # Voti ricevuti da tutti i sondaggi dell'utente (F() a ogni voto)
+    votes_received = models.IntegerField(default=0)
+    # ID degli ultimi sondaggi creati, dal più recente
+    recent_polls = models.JSONField(default=list)
+    # [{"poll", "poll_title", "choice", "choice_text", "voted_at"}, ...] dal più recente
+    recent_votes = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_dashboards'
+
+    def __str__(self):
+        return f"Dashboard di {self.user_id}"
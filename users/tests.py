@@ -1,3 +1,133 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from polls import expiry, screening
+from polls.models import Poll, Vote
+
+from . import dashboard
+from .authentication import user_cache_key
+from .models import UserDashboard
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='alice', email='alice@example.com', password='pw'
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.url = reverse('poll-votes', args=[0])
+
+    def test_user_lookup_is_cached(self):
+        # Prima richiesta: utente letto dal DB (solo le colonne necessarie)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        # Richieste successive: utente dalla cache, resta solo la query del sondaggio
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        # Nella cache condivisa, non in una per processo
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_password_change_revokes_token(self):
+        self.client.get(self.url)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivation_invalidates_cache(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class UserDashboardTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        screening.screen.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        self.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        self.url = reverse('user-dashboard')
+
+    def login(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def create_poll(self, title):
+        self.login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('poll-list-create'), {'title': title, 'choices': ['A', 'B']}, format='json'
+            )
+        return Poll.objects.get(pk=response.data['id'])
+
+    def vote(self, poll):
+        self.login(self.voter)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('poll-vote', args=[poll.pk]), {'choice': poll.choices.first().pk}, format='json')
+
+    def test_dashboard_updated_on_poll_and_vote(self):
+        first = self.create_poll('Primo')
+        second = self.create_poll('Secondo')
+        self.vote(first)
+
+        self.login(self.owner)
+        # Riepilogo con i contatori dell'utente, totali correnti dei sondaggi
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['stats'], {'polls_created': 2, 'votes_cast': 0, 'votes_received': 1})
+        self.assertEqual([(poll['id'], poll['total_votes']) for poll in data['polls']], [(second.pk, 0), (first.pk, 1)])
+        self.assertEqual(data['polls'][0]['created_at'], timezone.localtime(second.created_at).isoformat())
+        self.assertIsNone(data['polls'][0]['expires_at'])
+
+        # Riepilogo dalla cache: resta la query dei totali correnti
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        self.login(self.voter)
+        data = self.client.get(self.url).data
+        self.assertEqual(data['stats']['votes_cast'], 1)
+        self.assertEqual([(vote['poll'], vote['poll_title']) for vote in data['recent_votes']], [(first.pk, 'Primo')])
+        # Come le altre date dell'API: nel fuso di TIME_ZONE, con i microsecondi
+        voted_at = Vote.objects.get(user=self.voter).voted_at
+        self.assertEqual(data['recent_votes'][0]['voted_at'], timezone.localtime(voted_at).isoformat())
+
+        # Un nuovo voto invalida la dashboard del creatore
+        self.vote(second)
+        self.login(self.owner)
+        self.assertEqual(self.client.get(self.url).data['stats']['votes_received'], 2)
+
+    def test_missing_summary_is_rebuilt(self):
+        poll = self.create_poll('Primo')
+        self.vote(poll)
+        UserDashboard.objects.all().delete()
+        cache.clear()
+
+        self.login(self.voter)
+        self.assertEqual(self.client.get(self.url).data['recent_votes'][0]['choice_text'], 'A')
+        self.login(self.owner)
+        data = self.client.get(self.url).data
+        self.assertEqual(data['stats']['votes_received'], 1)
+        self.assertEqual([poll['title'] for poll in data['polls']], ['Primo'])
+
+    def test_rebuild_includes_archived_votes(self):
+        poll = self.create_poll('Primo')
+        self.vote(poll)
+        expiry.archive_votes([poll.pk])
+        dashboard.rebuild(self.voter.pk)
+        cache.clear()
+
+        self.login(self.voter)
+        self.assertEqual([vote['poll'] for vote in self.client.get(self.url).data['recent_votes']], [poll.pk])
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
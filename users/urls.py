@@ -1,6 +1,8 @@
 from django.urls import path
 
-# URL temporanei - li completeremo nella prossima fase
+from . import views
+
 urlpatterns = [
-    # Qui andrà l'autenticazione JWT
-]
\ No newline at end of file
+    # Dashboard dell'utente autenticato
+    path('me/dashboard/', views.user_dashboard, name='user-dashboard'),
+]
@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
 
-# Create your views here.
+from . import dashboard
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_dashboard(request):
+    """
+    Dashboard dell'utente autenticato: statistiche, ultimi sondaggi con i totali
+    correnti e ultimi voti, dal riepilogo precalcolato (users.dashboard)
+    """
+    data = dashboard.get_dashboard(request.user.pk)
+    if data is None:
+        return Response(
+            {'error': 'User not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(data)